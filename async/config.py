@@ -1,29 +1,62 @@
+import ast
 import os
 import logging
 
 
 class AppConfig:
-    """Configuration class for modifying behavior of the crawler."""
+    """
+    Configuration class for modifying behavior of the crawler.
+
+    Importing this module has no side effects. Every setting can be overridden
+    with a `CRAWLER_<NAME>` environment variable; `AppConfig.load()` must be
+    called once at startup to create the output folder and configure logging.
+    """
 
     # Directories
     OUTPUT_FOLDER = "output"
     FAILED_TASKS_FILE = os.path.join(OUTPUT_FOLDER, "failed_tasks.csv")
-    os.makedirs(OUTPUT_FOLDER, exist_ok=True)  # Ensure output folder exists
 
     # Logging Configuration
     SHOW_TRACEBACKS = False  # Set to True to show traceback details
     LOG_FILE = os.path.join(OUTPUT_FOLDER, "crawler.log")
     LOG_LEVEL = logging.INFO  # Change to DEBUG if needed
+    LOG_FORMAT = "text"  # "json" writes one JSON object per line (with per-app fields) to LOG_FILE
+    LOG_RATE_LIMIT = 50  # INFO/DEBUG lines per call site per interval, 0 disables
+    LOG_RATE_LIMIT_INTERVAL = 10  # seconds
 
     # Excel File Path
     EXCEL_FILE = os.path.join(OUTPUT_FOLDER, "apps_data.xlsx")
 
+    # Output Sinks: "excel" and/or "ndjson"
+    OUTPUT_SINKS = ("excel",)
+    NDJSON_FOLDER = os.path.join(OUTPUT_FOLDER, "ndjson")
+    NDJSON_COMPRESSION = "gzip"  # "gzip", "zstd" (needs `pip install zstandard`) or "none"
+    NDJSON_COMPRESSION_LEVEL = 3
+    NDJSON_SEGMENT_MAX_BYTES = 256 * 1024 * 1024  # uncompressed bytes per segment
+    NDJSON_SEGMENT_MAX_SECONDS = 300  # a segment is finished after this long, even if small
+
     # Playwright Settings
     HEADLESS_MODE = True  # Set to False for debugging
     LOG_MORE_COMMENTS_BUTTON_CLICKED = False
     REFRESH_NO_COMMENTS_PAGE_TIMEOUT = 30_000  # in milliseconds
     REFRESH_ALL_COMMENTS_PAGE_TIMEOUT = 360   # in seconds
 
+    # Comment Depth Policy (None = no limit)
+    COMMENT_MAX_COMMENTS = None  # stop paging once this many comments are loaded
+    COMMENT_MAX_CLICKS = None  # 'Load More' clicks per app
+    COMMENT_MAX_SECONDS = None  # seconds spent paging per app
+    COMMENT_SAMPLE_MODE = "newest"  # "newest" also trims to COMMENT_MAX_COMMENTS; "all" keeps what was loaded
+    COMMENT_FULL_HISTORY_FIRST = False  # no limits until an app's complete history was saved once
+    COMMENT_DEPTH_OVERRIDES = {}  # e.g. {"com.big.app": {"max_clicks": 20, "full_history_first": True}}
+
+    # Browser Recycling & Watchdog
+    BROWSER_MAX_PAGES = 50  # pages served by one Chromium before it is recycled
+    BROWSER_MEMORY_CEILING_MB = 2048  # Chromium RSS that triggers recycling
+    PAGE_MAX_DOM_NODES = 400_000  # pages above this stop loading more comments
+    PAGE_MAX_HEAP_MB = 1024  # same, for the page's JS heap
+    PAGE_STUCK_TIMEOUT = 60  # seconds without progress before a page is killed
+    WATCHDOG_INTERVAL = 5  # seconds between watchdog checks
+
     # Async Fetch/Timeout Settings
     FETCH_METADATA_TIMEOUT = 30
     FETCH_COMMENTS_TIMEOUT = 30
@@ -34,27 +67,156 @@ class AppConfig:
     MAIN_DOMAIN = "https://cafebazaar.ir"
     APP_ROUTE = "/lists/ml-mental-health-exercises"
 
+    # Per-app Deadline: one total budget that every stage's timeout is capped to
+    APP_DEADLINE = 420  # seconds per app, excluding time queued for a slot (None disables)
+    DEADLINE_MIN_COMMENTS_STAGE = 30  # seconds an app needs left to open a comments page
+    DEADLINE_PARSE_RESERVE = 10  # seconds kept for reading the page HTML and parsing it
+
     # Retry settings for HTTPX
     MAX_RETRIES = 3
     REQUEST_TIMEOUT = 10.0  # seconds
 
+    # HTTP Client (one pooled httpx client per process)
+    HTTP2_ENABLED = False  # needs `pip install httpx[http2]`
+    HTTP_MAX_CONNECTIONS = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+    HTTP_KEEPALIVE_EXPIRY = 30.0  # seconds an idle connection is kept open
+    HTTP_PER_HOST_CONNECTIONS = 16  # concurrent requests per host
+    HTTP_COMPRESSION = True  # accept gzip/deflate (br/zstd if installed) responses
+
+    # Adaptive Concurrency (AIMD) for metadata fetches and browser pages
+    FETCH_CONCURRENCY_INITIAL = 8
+    FETCH_CONCURRENCY_MIN = 1
+    FETCH_CONCURRENCY_MAX = 64
+    FETCH_LATENCY_TARGET = 5.0  # seconds; slower fetches shrink the limit
+    BROWSER_CONCURRENCY_INITIAL = 2
+    BROWSER_CONCURRENCY_MIN = 1
+    BROWSER_CONCURRENCY_MAX = 8
+    BROWSER_LATENCY_TARGET = None  # comment pages vary too much, only errors/memory count
+    MEMORY_CEILING_MB = 4096  # RSS of the crawler incl. Chromium that shrinks both limits
+
+    # Crawl Scheduling: most valuable apps first, by history from past runs
+    SCHEDULE_ENABLED = True  # False keeps the listing order
+    SCHEDULE_MAX_IN_FLIGHT = 32  # apps processed at once in local mode
+    RUN_TIME_BUDGET = None  # seconds; apps whose estimated crawl time no longer fits are skipped
+    CRAWL_HISTORY_FILE = os.path.join(OUTPUT_FOLDER, "crawl_history.json")
+    SCHEDULE_DEFAULT_COST = 60  # seconds assumed for apps without history
+    SCHEDULE_DEFAULT_COMMENT_RATE = 5  # new comments per day assumed for apps without history
+    SCHEDULE_NEVER_CRAWLED_DAYS = 30  # staleness assumed for apps never crawled
+    SCHEDULE_SMOOTHING = 0.5  # weight of the latest run in the moving averages
+
+    # Comment Dedupe (fingerprints of comments already written, 8 bytes each)
+    DEDUPE_COMMENTS = True
+    DEDUPE_INDEX_FILE = os.path.join(OUTPUT_FOLDER, "comment_fingerprints.bin")
+    DEDUPE_COMPACT_EVERY = 100_000  # new fingerprints kept in a set before they are merged into the file, 0: on exit only
+
+    # Per-app rating histogram, average and comments per day, merged across runs
+    AGGREGATES_ENABLED = True
+    AGGREGATES_FILE = os.path.join(OUTPUT_FOLDER, "app_aggregates.json")
+    AGGREGATES_SAVE_INTERVAL = 60  # seconds between writes of the file, it is also written on exit
+
+    # Image Downloads (optional stage)
+    DOWNLOAD_IMAGES = False  # download screenshots after each app is crawled
+    IMAGES_FOLDER = os.path.join(OUTPUT_FOLDER, "images")  # files are named by content hash
+    IMAGE_INDEX_FILE = os.path.join(OUTPUT_FOLDER, "images.sqlite3")  # url -> hash/size
+    IMAGE_TARGET_WIDTH = 800  # smallest srcset candidate at least this wide is picked
+    IMAGE_TARGET_DENSITY = 2.0  # for "1x, 2x" style srcsets
+    IMAGE_DOWNLOAD_CONCURRENCY = 8
+    IMAGE_HEAD_ONLY = False  # only record sizes with HEAD requests, don't download
+
+    # Metrics
+    METRICS_FILE = os.path.join(OUTPUT_FOLDER, "metrics.prom")  # Prometheus text format
+    METRICS_EXPORT_INTERVAL = 15  # seconds between metrics file writes
+    METRICS_HTTP_PORT = None  # e.g. 9108 to also serve http://127.0.0.1:9108/metrics
+
+    # Profiling (enable with `python run.py --profile`)
+    PROFILE_ENABLED = False
+    PROFILE_FOLDER = os.path.join(OUTPUT_FOLDER, "profile")
+    PROFILE_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+    PROFILE_SLOW_CALLBACK = 0.1  # seconds; asyncio logs callbacks that block the loop longer
+
+    # Coordinator / Worker Mode
+    QUEUE_FILE = os.path.join(OUTPUT_FOLDER, "work_queue.sqlite3")
+    QUEUE_VISIBILITY_TIMEOUT = 600  # seconds a leased URL stays hidden from other workers
+    QUEUE_MAX_ATTEMPTS = 3  # attempts per URL before it is marked as failed
+    QUEUE_SHARED_FILESYSTEM = False  # True when workers on other hosts use the queue file (no WAL)
+    QUEUE_POLL_INTERVAL = 2  # seconds an idle worker waits before asking again
+    WORKER_COUNT = os.cpu_count() or 1  # local worker processes spawned by the coordinator
+    WORKER_CONCURRENCY = 2  # apps processed at once inside one worker process
+
+    _loaded = False
+
+    @classmethod
+    def load(cls):
+        """Creates the output folder and configures logging. Safe to call more than once."""
+        if cls._loaded:
+            return cls
+        os.makedirs(cls.OUTPUT_FOLDER, exist_ok=True)
+        configure_logging(cls)
+        cls._loaded = True
+        cls.log_config()
+        return cls
+
     @classmethod
     def log_config(cls):
         logging.info("🔧 Configuration loaded successfully:")
 
 
-# === Initialize Logging ===
-logging.basicConfig(
-    filename=AppConfig.LOG_FILE,
-    level=AppConfig.LOG_LEVEL,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    filemode="a",
-)
-console_handler = logging.StreamHandler()
-console_handler.setLevel(AppConfig.LOG_LEVEL)
-console_handler.setFormatter(
-    logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-)
-logging.getLogger().addHandler(console_handler)
-
-AppConfig.log_config()
+def _parse_env_value(raw: str, default):
+    """Converts an environment string to the type of the setting's default."""
+    if isinstance(default, bool):
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, (int, float)):
+        try:
+            return type(default)(raw)
+        except ValueError:
+            level = logging.getLevelName(raw.strip().upper())  # e.g. CRAWLER_LOG_LEVEL=DEBUG
+            if isinstance(level, int):
+                return level
+            raise
+    if isinstance(default, dict):
+        return ast.literal_eval(raw)
+    if isinstance(default, (tuple, list)):
+        return tuple(item.strip() for item in raw.split(",") if item.strip())  # e.g. "excel,ndjson"
+    if default is None:
+        try:
+            return ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            return raw
+    return raw
+
+
+def apply_env_overrides(config=AppConfig, prefix: str = "CRAWLER_"):
+    """
+    Overrides settings from `CRAWLER_<NAME>` environment variables. Paths
+    under the default OUTPUT_FOLDER follow an overridden one, unless they
+    were overridden themselves.
+    """
+    default_folder = config.OUTPUT_FOLDER
+    overridden = set()
+    for name, default in vars(config).items():
+        raw = os.environ.get(prefix + name) if name.isupper() else None
+        if raw is not None:
+            setattr(config, name, _parse_env_value(raw, default))
+            overridden.add(name)
+    if config.OUTPUT_FOLDER != default_folder:
+        _move_output_paths(config, default_folder, exclude=overridden)
+
+
+def _move_output_paths(config, old_folder: str, exclude=()):
+    """Re-derives settings like LOG_FILE = "<old_folder>/crawler.log" from OUTPUT_FOLDER."""
+    for name, value in list(vars(config).items()):
+        if name.isupper() and name not in exclude and isinstance(value, str) and value.startswith(old_folder + os.sep):
+            setattr(config, name, os.path.join(config.OUTPUT_FOLDER, os.path.relpath(value, old_folder)))
+
+
+def configure_logging(config=AppConfig):
+    """Logs to LOG_FILE and the console through a background queue listener."""
+    from utils.logging_setup import setup_logging
+
+    setup_logging(config)
+
+
+# Environment overrides are pure, so they apply on import: module level
+# defaults like `WorkQueue(path=AppConfig.QUEUE_FILE)` see the final values.
+apply_env_overrides()
@@ -1,22 +1,53 @@
+import time
+
+_STARTED = time.perf_counter()  # before any other import, to report startup time
+
+import argparse
 import logging
-import pandas as pd
+import os
+import socket
+import sys
 import asyncio
+from collections import deque
+from typing import List, Optional, Tuple
 from config import AppConfig
+from services.aggregate_service import aggregates_enabled, close_aggregates, update_aggregates
+from services.dedupe_service import app_key_from_url, close_comment_index, get_comment_index
+from services.depth_service import apply_sampling, resolve_depth_policy, validate_depth_settings
 from services.fetch_service import (
     get_app_metadata,
     get_app_links,
     extract_comments,
 )
-from services.playwright_service import fetch_comments_full_page_with_timeout
-from services.io_service import write_to_excel, create_excel_if_not_exists
+from services.playwright_service import browser_manager, fetch_comments_full_page_with_timeout
+from services.image_service import close_image_store, download_app_images, download_images, get_image_store
+from services.io_service import close_sinks, open_sinks, write_records
+from services.queue_service import WorkQueue
+from services.records import AppMetadata, CommentMetadata
+from services.schedule_service import RunBudget, estimated_cost, get_crawl_history, parse_install_count, rank
 from utils.common import log_failed_task
+from utils.concurrency import browser_limiter
+from utils.deadline import DeadlineExceeded, app_deadline, can_cover
+from utils.http_client import close_client, open_client
+from utils.logging_setup import app_log_context, bind_app_log_context
+from utils.metrics import metrics, run_metrics_exporter
+from utils.profiling import profiler, timestamped_profile_dir
 
 
-async def process_app(full_url: str):
+async def crawl_app(full_url: str) -> Optional[Tuple[AppMetadata, List[CommentMetadata]]]:
     """
-    Processes each app: fetch metadata, fetch comments HTML (via Playwright),
-    parse comments, and persist results.
+    Crawls a single app within its APP_DEADLINE: fetch metadata, fetch comments
+    HTML (via Playwright) and parse comments. Returns None if any stage fails,
+    and raises DeadlineExceeded if it failed because the budget ran out.
     """
+    with app_log_context(app_url=full_url), app_deadline(AppConfig.APP_DEADLINE) as deadline:
+        result = await _crawl_app(full_url)
+    if result is None and deadline is not None and deadline.exhausted:
+        raise DeadlineExceeded(f"App deadline of {deadline.budget:.0f}s exceeded: {full_url}")
+    return result
+
+
+async def _crawl_app(full_url: str) -> Optional[Tuple[AppMetadata, List[CommentMetadata]]]:
     # 1) Fetch App Metadata
     try:
         app_metadata = await get_app_metadata(full_url)
@@ -25,63 +56,418 @@ async def process_app(full_url: str):
     except asyncio.TimeoutError:
         log_failed_task(full_url, "Metadata Timeout", "Metadata fetch exceeded timeout.")
         logging.warning(f"⚠️ Skipping app due to metadata timeout: {full_url}")
-        return
+        return None
     except Exception as e:
         log_failed_task(full_url, "Metadata Error", str(e))
         logging.warning(f"⚠️ Skipping app due to metadata failure: {full_url}")
-        return
+        return None
+
+    bind_app_log_context(app_id=app_metadata.app_id, app_name=app_metadata.app_name)
+    logging.info(f"✅ App metadata fetched: {app_metadata.app_name} (ID: {app_metadata.app_id})")
 
-    logging.info(f"✅ App metadata fetched: {app_metadata.get('app_name')} (ID: {app_metadata.get('app_id')})")
+    # 2) Fetch Full Page HTML with Comments (Playwright), if the deadline leaves enough time
+    if not can_cover(AppConfig.DEADLINE_MIN_COMMENTS_STAGE):
+        log_failed_task(full_url, "Deadline Exceeded", "Not enough time left for the comments page.")
+        logging.warning(f"⏳ Skipping app, its deadline can't cover the comments page: {full_url}")
+        return None
 
-    # 2) Fetch Full Page HTML with Comments (Playwright)
+    policy = resolve_depth_policy(app_key_from_url(full_url))
     try:
-        page_html = await fetch_comments_full_page_with_timeout(full_url)
+        async with browser_limiter.slot():
+            page = await fetch_comments_full_page_with_timeout(full_url, policy)
+            if not page.html:
+                # Playwright errors, pages killed by the watchdog and browser crashes return "".
+                # Raising inside the slot counts as an error for the limiter.
+                raise RuntimeError("The comments page returned no HTML.")
     except TimeoutError:
         log_failed_task(full_url, "Comment Timeout", "Comment fetch exceeded timeout.")
         logging.warning(f"⚠️ Skipping app due to comment timeout: {full_url}")
-        return
+        return None
     except Exception as e:
         log_failed_task(full_url, "Comment Error", str(e))
         logging.warning(f"⚠️ Skipping app due to comment failure: {full_url}")
-        return
+        return None
 
     # 3) Parse Comments (BeautifulSoup)
     try:
-        comments = extract_comments(page_html, app_metadata["app_id"])
+        comments = extract_comments(page.html, app_metadata.app_id)
     except Exception as e:
         log_failed_task(full_url, "Comment Parsing Error", str(e))
         logging.warning(f"⚠️ Skipping app due to comment parsing failure: {full_url}")
-        return
+        return None
 
-    logging.info(f"💬 Fetched {len(comments)} comments for {app_metadata['app_name']}")
+    comments, sampled = apply_sampling(comments, policy)
+    app_metadata.comments_complete = page.complete and not sampled
+    history_state = "complete" if app_metadata.comments_complete else "truncated"
+    logging.info(f"💬 Fetched {len(comments)} comments for {app_metadata.app_name} ({history_state})")
+    return app_metadata, comments
 
-    # 4) Store data to Excel
-    app_df = pd.DataFrame([app_metadata])
-    comments_df = pd.DataFrame(comments)
-    write_to_excel(app_df, comments_df)
 
-    logging.info(f"📂 Data saved successfully for: {app_metadata['app_name']}")
+def store_app(
+    app_url: str,
+    app_metadata: AppMetadata,
+    comments: List[CommentMetadata],
+    crawl_seconds: Optional[float] = None,
+):
+    """
+    Persists one crawled app and its comments not written before to the
+    OUTPUT_SINKS, and records the crawl in the history used for scheduling.
+    """
+    app_key = app_key_from_url(app_url)
+    fingerprints = None
+    if AppConfig.DEDUPE_COMMENTS:
+        total = len(comments)
+        comments, fingerprints = get_comment_index().filter_new(app_key, comments)
+        if total > len(comments):
+            metrics.duplicates.inc(total - len(comments))
+            logging.info(f"🧾 Dropped {total - len(comments)} already saved comments of {app_metadata.app_name}")
 
+    write_records(app_metadata, comments)
+    # Aggregates count what the sinks hold, so they are journaled right after the
+    # write and before the fingerprints: a crash in between makes the next run
+    # write (and count) these comments again, rather than hide them from both.
+    if aggregates_enabled():
+        update_aggregates(app_key, app_metadata.app_name, comments)
+    if fingerprints:
+        # Only after the write: a failed write must not hide its comments next time
+        get_comment_index().add(fingerprints)
+    get_crawl_history().record(
+        app_key, crawl_seconds, len(comments), parse_install_count(app_metadata.installation_counts),
+        complete=app_metadata.comments_complete,
+    )
 
-async def main():
-    """Main function that runs the crawler."""
-    create_excel_if_not_exists()
+    logging.info(f"📂 Data saved successfully for: {app_metadata.app_name}")
+
+
+async def process_app(full_url: str):
+    """
+    Processes each app: fetch metadata, fetch comments HTML (via Playwright),
+    parse comments, and persist results.
+    """
+    started = time.monotonic()
+    try:
+        result = await crawl_app(full_url)
+    except DeadlineExceeded:
+        metrics.apps.inc(status="deadline")
+        result = None
+    else:
+        metrics.apps.inc(status="failed" if result is None else "ok")
+    if result is None:
+        get_crawl_history().record_failure(app_key_from_url(full_url), time.monotonic() - started)
+    else:
+        store_app(full_url, *result, crawl_seconds=time.monotonic() - started)
+        if AppConfig.DOWNLOAD_IMAGES:
+            await download_app_images(result[0])
+
+
+async def process_scheduled(urls: List[str]):
+    """
+    Processes the most valuable apps first (see services.schedule_service):
+    at most SCHEDULE_MAX_IN_FLIGHT at a time, and only while their estimated
+    crawl time still fits into RUN_TIME_BUDGET.
+    """
+    history = get_crawl_history()
+    ranked = rank(urls, history) if AppConfig.SCHEDULE_ENABLED else [(url, 0.0) for url in urls]
+    if AppConfig.SCHEDULE_ENABLED and ranked:
+        top = ", ".join(f"{app_key_from_url(url)} ({score:.2f})" for url, score in ranked[:5])
+        logging.info(f"📋 Crawl order by expected value per second, top: {top}")
 
-    # 1) Get all the app links
+    budget = RunBudget()
+    pending = deque(url for url, _ in ranked)
+    skipped = 0
+
+    async def scheduler_slot():
+        nonlocal skipped
+        while pending:
+            url = pending.popleft()
+            # A cheaper app further down may still fit, so keep going
+            if not budget.fits(estimated_cost(history.get(app_key_from_url(url)))):
+                skipped += 1
+                metrics.apps.inc(status="skipped")
+                continue
+            await process_app(url)
+
+    await asyncio.gather(*(scheduler_slot() for _ in range(AppConfig.SCHEDULE_MAX_IN_FLIGHT)))
+    if skipped:
+        logging.info(f"⏭️ Run budget left no time for {skipped} apps, they rank higher next run.")
+
+
+async def fetch_listing_urls() -> List[str]:
+    """Returns the full URLs of all apps on the configured listing page."""
     listing_url = AppConfig.MAIN_DOMAIN + AppConfig.APP_ROUTE
     links = await get_app_links(listing_url)
     logging.info(f"🔗 Found {len(links)} apps to process.")
+    return [AppConfig.MAIN_DOMAIN + link for link in links]
+
+
+def start_metrics(path: str = AppConfig.METRICS_FILE, http_port=AppConfig.METRICS_HTTP_PORT) -> asyncio.Task:
+    """Starts the background metrics exporter."""
+    return asyncio.create_task(
+        run_metrics_exporter(path, AppConfig.METRICS_EXPORT_INTERVAL, http_port)
+    )
+
+
+async def stop_metrics(exporter: asyncio.Task):
+    """Stops the exporter (writing a last snapshot) and logs the run summary."""
+    exporter.cancel()
+    await asyncio.gather(exporter, return_exceptions=True)
+    logging.info("📊 Run summary:\n" + metrics.summary_table())
+
+
+async def main():
+    """Main function that runs the crawler."""
+    open_sinks()
+    exporter = start_metrics()
+    open_client()
+
+    try:
+        # 1) Get all the app links
+        urls = await fetch_listing_urls()
 
-    # 2) Process them in parallel (gather). For large sets, consider concurrency limits (semaphore).
-    tasks = [process_app(AppConfig.MAIN_DOMAIN + link) for link in links]
-    await asyncio.gather(*tasks)
+        # 2) Process them in priority order, several at once. Fetches and browser
+        #    pages are bounded by the adaptive limiters in utils.concurrency.
+        await process_scheduled(urls)
+    finally:
+        await close_client()
+        await browser_manager.close()
+        close_image_store()
+        close_comment_index()
+        close_aggregates()
+        close_sinks()
+        await stop_metrics(exporter)
 
     logging.info("✅ All apps processed successfully!")
 
 
+# === Coordinator / Worker Mode ===
+
+async def _keep_lease(queue: WorkQueue, url: str, worker_id: str):
+    """Extends the lease on `url` until cancelled, so slow apps aren't handed out twice."""
+    while True:
+        await asyncio.sleep(queue.visibility_timeout / 3)
+        if not await asyncio.to_thread(queue.extend, url, worker_id):
+            logging.warning(f"⚠️ Lost lease on {url}")
+            return
+
+
+async def run_worker(queue_path: str, worker_id: str):
+    """Leases URLs from the shared queue and crawls them until the queue is drained."""
+    queue = WorkQueue(queue_path)
+    logging.info(f"👷 Worker {worker_id} started on {queue_path}")
+    # One metrics file per worker; several workers can't share a port
+    exporter = start_metrics(f"{os.path.splitext(AppConfig.METRICS_FILE)[0]}.{worker_id}.prom", None)
+    open_client()
+
+    async def worker_slot():
+        while True:
+            url = await asyncio.to_thread(queue.lease, worker_id)
+            if url is None:
+                # Leased URLs may still come back if their worker dies
+                if await asyncio.to_thread(queue.unfinished_count) == 0:
+                    return
+                await asyncio.sleep(AppConfig.QUEUE_POLL_INTERVAL)
+                continue
+
+            heartbeat = asyncio.create_task(_keep_lease(queue, url, worker_id))
+            started = time.monotonic()
+            try:
+                result = await crawl_app(url)
+            except DeadlineExceeded as e:
+                # Back to the queue behind the other apps, a later attempt may be less contended
+                metrics.apps.inc(status="deadline")
+                await asyncio.to_thread(
+                    queue.fail, url, worker_id, str(e), priority_penalty=1, crawl_seconds=time.monotonic() - started
+                )
+                continue
+            except Exception as e:
+                logging.error(f"❌ Worker {worker_id} crashed on {url}: {e}")
+                result = None
+            finally:
+                heartbeat.cancel()
+
+            metrics.apps.inc(status="failed" if result is None else "ok")
+            if result is None:
+                await asyncio.to_thread(
+                    queue.fail, url, worker_id, "crawl failed", crawl_seconds=time.monotonic() - started
+                )
+            else:
+                app_metadata, comments = result
+                await asyncio.to_thread(queue.complete, url, worker_id, {
+                    "app": app_metadata.to_dict(),
+                    "comments": [comment.to_row() for comment in comments],
+                    "crawl_seconds": time.monotonic() - started,
+                })
+                if AppConfig.DOWNLOAD_IMAGES:
+                    await download_app_images(app_metadata)
+
+    try:
+        await asyncio.gather(*(worker_slot() for _ in range(AppConfig.WORKER_CONCURRENCY)))
+    finally:
+        queue.close()
+        await close_client()
+        await browser_manager.close()
+        close_image_store()
+        await stop_metrics(exporter)
+
+    logging.info(f"👷 Worker {worker_id} finished, queue is drained.")
+
+
+def merge_results(queue_path: str) -> int:
+    """
+    Writes every finished but not yet merged queue result to the OUTPUT_SINKS,
+    and records apps that failed for good in the crawl history.
+    """
+    open_sinks()
+    queue = WorkQueue(queue_path)
+    merged = 0
+    try:
+        for url, result in queue.iter_unmerged_results():
+            store_app(
+                url,
+                AppMetadata.from_dict(result["app"]),
+                [CommentMetadata.from_row(row) for row in result["comments"]],
+                result.get("crawl_seconds"),
+            )
+            queue.mark_merged(url)
+            merged += 1
+        for url, attempt in queue.iter_unmerged_failures():
+            # Apps that failed for good still cost their crawl time next run
+            get_crawl_history().record_failure(app_key_from_url(url), attempt.get("crawl_seconds"))
+            queue.mark_merged(url)
+        logging.info(f"🧩 Merged {merged} app results. Queue status: {queue.stats()}")
+    finally:
+        queue.close()
+        close_comment_index()
+        close_aggregates()
+        close_sinks()
+    return merged
+
+
+async def run_image_backfill():
+    """Downloads the screenshots of every app already in the Excel file."""
+    import ast
+    from openpyxl import load_workbook
+
+    book = load_workbook(AppConfig.EXCEL_FILE, read_only=True)
+    try:
+        sheet = book["Apps"]
+        header = [cell.value for cell in next(sheet.iter_rows(max_row=1))]
+        images_column = header.index("app_images")
+        srcsets = []
+        for row in sheet.iter_rows(min_row=2, values_only=True):
+            if row[images_column]:
+                srcsets.extend(ast.literal_eval(row[images_column]))
+    finally:
+        book.close()
+
+    logging.info(f"🖼️ Backfilling {len(srcsets)} images from {AppConfig.EXCEL_FILE}")
+    open_client()
+    try:
+        counts = await download_images(srcsets, get_image_store())
+    finally:
+        close_image_store()
+        await close_client()
+    logging.info(f"🖼️ Image backfill done: {counts}")
+
+
+async def run_merge(queue_path: str):
+    """Async entry point for `--mode merge` (nothing else runs on the loop)."""
+    merge_results(queue_path)
+
+
+async def run_coordinator(queue_path: str, worker_count: int):
+    """
+    Fills the work queue with the listing URLs, spawns local worker
+    processes, waits for them and merges their results.
+    Workers on other hosts can join with `--mode worker` on the same queue file
+    (with QUEUE_SHARED_FILESYSTEM set everywhere, see README).
+    """
+    queue = WorkQueue(queue_path)
+    open_client()
+    try:
+        urls = await fetch_listing_urls()
+        if AppConfig.SCHEDULE_ENABLED:
+            added = queue.enqueue_ranked(rank(urls, get_crawl_history()))
+        else:
+            added = queue.enqueue(urls)
+        logging.info(f"📬 Queued {added} apps for this run ({queue.unfinished_count()} unfinished).")
+    finally:
+        queue.close()
+        await close_client()
+
+    host = socket.gethostname()
+    extra_args = ["--profile"] if AppConfig.PROFILE_ENABLED else []
+    workers = [
+        await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__),
+            "--mode", "worker",
+            "--queue", queue_path,
+            "--worker-id", f"{host}-{index}",
+            *extra_args,
+        )
+        for index in range(worker_count)
+    ]
+    logging.info(f"🚚 Spawned {len(workers)} worker processes.")
+
+    exit_codes = await asyncio.gather(*(worker.wait() for worker in workers))
+    if any(exit_codes):
+        logging.warning(f"⚠️ Some workers exited with errors: {exit_codes}")
+
+    merge_results(queue_path)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="CafeBazaar apps & comments crawler")
+    parser.add_argument(
+        "--mode", choices=["local", "coordinator", "worker", "merge", "images"], default="local",
+        help="local: crawl in this process (default); coordinator: queue URLs and spawn "
+             "workers; worker: crawl URLs from the queue; merge: write queue results to Excel; "
+             "images: download screenshots of apps already in the Excel file",
+    )
+    parser.add_argument("--queue", default=AppConfig.QUEUE_FILE, help="Path of the shared queue file")
+    parser.add_argument("--workers", type=int, default=AppConfig.WORKER_COUNT,
+                        help="Local worker processes spawned by the coordinator")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}",
+                        help="Unique id of this worker (used for leases)")
+    parser.add_argument("--profile", action="store_true", default=AppConfig.PROFILE_ENABLED,
+                        help="Log slow event loop callbacks and write per-stage profiles "
+                             "to PROFILE_FOLDER")
+    return parser.parse_args()
+
+
+async def run_profiled(coro, profile_dir: str):
+    """Runs a coroutine with profiling enabled inside its event loop."""
+    profiler.start(profile_dir, AppConfig.PROFILE_SAMPLE_INTERVAL, AppConfig.PROFILE_SLOW_CALLBACK)
+    try:
+        return await coro
+    finally:
+        profiler.stop()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    AppConfig.PROFILE_ENABLED = args.profile
+    AppConfig.load()
+    startup = time.perf_counter() - _STARTED
+    metrics.startup_seconds.set(startup)
+    logging.info(f"⏱️ Startup took {startup * 1000:.0f} ms (imports + config)")
     try:
+        validate_depth_settings()
         logging.info("🚀 Starting Crawler...")
-        asyncio.run(main())
+        if args.mode == "coordinator":
+            entry = run_coordinator(args.queue, args.workers)
+        elif args.mode == "worker":
+            entry = run_worker(args.queue, args.worker_id)
+        elif args.mode == "merge":
+            entry = run_merge(args.queue)
+        elif args.mode == "images":
+            entry = run_image_backfill()
+        else:
+            entry = main()
+
+        if args.profile:
+            suffix = args.worker_id if args.mode == "worker" else args.mode
+            entry = run_profiled(entry, timestamped_profile_dir(AppConfig.PROFILE_FOLDER, suffix))
+        asyncio.run(entry)
     except Exception as e:
         logging.error(f"❌ An error occurred in main: {e}")
@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from config import AppConfig
+from services.records import CommentMetadata
+
+
+@dataclass(slots=True)
+class AppAggregate:
+    """Running rating/volume counters of one app, updated with every newly saved comment."""
+
+    app_key: str
+    app_name: str = ""
+    rating_counts: List[int] = field(default_factory=lambda: [0] * 6)  # index = stars, 0 = unrated
+    comment_count: int = 0
+    rating_sum: int = 0
+    comments_per_day: Dict[str, int] = field(default_factory=dict)
+    updated_at: float = 0.0
+
+    @property
+    def rated_count(self) -> int:
+        return self.comment_count - self.rating_counts[0]
+
+    @property
+    def average_rating(self) -> Optional[float]:
+        return self.rating_sum / self.rated_count if self.rated_count else None
+
+    def add(self, comments: Iterable[CommentMetadata]):
+        self.add_ratings((comment.rating, comment.comment_date) for comment in comments)
+
+    def add_ratings(self, ratings: Iterable[Tuple[int, str]]):
+        """Adds (rating, comment_date) pairs."""
+        for rating, date in ratings:
+            stars = min(max(rating, 0), 5)
+            self.rating_counts[stars] += 1
+            self.rating_sum += stars
+            self.comment_count += 1
+            if date:
+                self.comments_per_day[date] = self.comments_per_day.get(date, 0) + 1
+        self.updated_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "app_name": self.app_name,
+            "rating_counts": self.rating_counts,
+            "comment_count": self.comment_count,
+            "rating_sum": self.rating_sum,
+            "average_rating": self.average_rating,
+            "comments_per_day": self.comments_per_day,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, app_key: str, data: Dict[str, Any]) -> "AppAggregate":
+        return cls(
+            app_key=app_key,
+            app_name=data.get("app_name", ""),
+            rating_counts=list(data.get("rating_counts", [0] * 6)),
+            comment_count=data.get("comment_count", 0),
+            rating_sum=data.get("rating_sum", 0),
+            comments_per_day=dict(data.get("comments_per_day", {})),
+            updated_at=data.get("updated_at", 0.0),
+        )
+
+
+class AggregateStore:
+    """
+    Per-app aggregates persisted as one JSON file next to the Excel output.
+    Counters are loaded at start and only grow, so every run adds to the
+    totals of the previous ones (comments must be deduped before `update`).
+
+    Like the comment index, every update is appended to a journal right
+    away and the file is only rewritten now and then, so a crash loses no
+    counts. Journal lines carry a sequence number; lines the file already
+    includes are skipped on load.
+    """
+
+    def __init__(self, path: str = AppConfig.AGGREGATES_FILE):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.apps: Dict[str, AppAggregate] = {}
+        self.sequence = 0  # of the last update, saved with the file
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.apps = {key: AppAggregate.from_dict(key, value) for key, value in data["apps"].items()}
+            self.sequence = data.get("sequence", 0)
+        self._replay_journal()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        intact = 0  # bytes up to the last complete line
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                intact += len(line)
+                if entry["seq"] > self.sequence:
+                    self._aggregate(entry["app_key"], entry["app_name"]).add_ratings(entry["ratings"])
+                    self.sequence = entry["seq"]
+                    self.dirty = True
+        if intact < os.path.getsize(self.journal_path):
+            # A torn last write; cut it off so new lines don't follow it
+            os.truncate(self.journal_path, intact)
+
+    def _aggregate(self, app_key: str, app_name: str) -> AppAggregate:
+        aggregate = self.apps.get(app_key)
+        if aggregate is None:
+            aggregate = self.apps[app_key] = AppAggregate(app_key)
+        aggregate.app_name = app_name
+        return aggregate
+
+    def update(self, app_key: str, app_name: str, comments: List[CommentMetadata]) -> AppAggregate:
+        """Adds comments to the app's counters and journals them (flushed before returning)."""
+        ratings = [(comment.rating, comment.comment_date) for comment in comments]
+        self.sequence += 1
+        entry = {"seq": self.sequence, "app_key": app_key, "app_name": app_name, "ratings": ratings}
+        self._journal.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._journal.flush()
+        aggregate = self._aggregate(app_key, app_name)
+        aggregate.add_ratings(ratings)
+        self.dirty = True
+        return aggregate
+
+    def save(self):
+        """Writes the file atomically (temp file + rename), then empties the journal."""
+        data = {
+            "updated_at": time.time(),
+            "sequence": self.sequence,
+            "apps": {key: agg.to_dict() for key, agg in self.apps.items()},
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        # A crash before the truncate leaves lines the file already has; `sequence` skips them
+        self._journal.truncate(0)
+        self.dirty = False
+        self.saved_at = time.monotonic()
+
+    def close(self):
+        if self.dirty:
+            self.save()
+        self._journal.close()
+
+
+_store: Optional[AggregateStore] = None
+_dedupe_warned = False
+
+
+def aggregates_enabled() -> bool:
+    """
+    AGGREGATES_ENABLED, but only together with DEDUPE_COMMENTS: without it
+    every re-crawl would add the same comments to the counters again.
+    """
+    global _dedupe_warned
+    if not AppConfig.AGGREGATES_ENABLED:
+        return False
+    if not AppConfig.DEDUPE_COMMENTS:
+        if not _dedupe_warned:
+            logging.warning("⚠️ AGGREGATES_ENABLED needs DEDUPE_COMMENTS, aggregates are not updated")
+            _dedupe_warned = True
+        return False
+    return True
+
+
+def get_aggregate_store() -> AggregateStore:
+    """Returns the aggregate store shared by this process, loading it on first use."""
+    global _store
+    if _store is None:
+        _store = AggregateStore()
+        logging.info(f"📈 Loaded aggregates of {len(_store.apps)} apps from {_store.path}")
+    return _store
+
+
+def update_aggregates(app_key: str, app_name: str, comments: List[CommentMetadata]):
+    """
+    Adds newly saved comments to the app's aggregates. They are journaled at
+    once; the file is rewritten every AGGREGATES_SAVE_INTERVAL seconds.
+    """
+    store = get_aggregate_store()
+    store.update(app_key, app_name, comments)
+    if time.monotonic() - store.saved_at >= AppConfig.AGGREGATES_SAVE_INTERVAL:
+        store.save()
+
+
+def close_aggregates():
+    """Writes pending aggregate updates into the file."""
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
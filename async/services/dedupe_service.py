@@ -0,0 +1,141 @@
+import bisect
+import hashlib
+import heapq
+import logging
+import os
+from array import array
+from typing import Iterable, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlparse
+from config import AppConfig
+from services.records import CommentMetadata
+
+# Fingerprints are unsigned 64-bit ints ("Q"): 8 bytes per comment on disk and
+# in memory. The index file is a sorted array; fingerprints added since the last
+# compaction are appended to a journal file and kept in a set, which is merged
+# into the array (and file) once it holds DEDUPE_COMPACT_EVERY of them, and on
+# close/load. A plain bisect over the array is faster than a Bloom filter in
+# front of it, at this size.
+
+
+def app_key_from_url(app_url: str) -> str:
+    """Stable key of an app across runs (app_id is random): the last path segment."""
+    path = unquote(urlparse(app_url).path).rstrip("/")
+    return path.rsplit("/", 1)[-1] or app_url
+
+
+def comment_fingerprint(app_key: str, comment: CommentMetadata) -> int:
+    """64-bit hash of app + account_id + date + body."""
+    data = "\x1f".join((app_key, comment.account_id, comment.comment_date, comment.comment))
+    return int.from_bytes(hashlib.blake2b(data.encode(), digest_size=8).digest(), "little")
+
+
+class CommentIndex:
+    """
+    Persistent set of comment fingerprints. `filter_new` drops comments that
+    were already written; `add` records fingerprints once the sink has them.
+    """
+
+    def __init__(
+        self,
+        path: str = AppConfig.DEDUPE_INDEX_FILE,
+        compact_every: int = AppConfig.DEDUPE_COMPACT_EVERY,
+    ):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_every = compact_every
+        self._sorted = self._load()
+        self._recent: Set[int] = set(self._read_journal())
+        self._journal = open(self.journal_path, "ab")
+        logging.info(f"🧾 Comment index loaded: {len(self)} fingerprints from {self.path}")
+
+    def _load(self) -> array:
+        fingerprints = array("Q")
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                fingerprints.frombytes(f.read())
+        return fingerprints
+
+    def _read_journal(self) -> array:
+        fingerprints = array("Q")
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                data = f.read()
+            intact = len(data) - len(data) % fingerprints.itemsize
+            fingerprints.frombytes(data[:intact])
+            if intact < len(data):
+                # A torn last write left a partial fingerprint; cut it off so appends stay aligned
+                os.truncate(self.journal_path, intact)
+        return fingerprints
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._recent)
+
+    def __contains__(self, fingerprint: int) -> bool:
+        return fingerprint in self._recent or self._in_sorted(fingerprint)
+
+    def _in_sorted(self, fingerprint: int) -> bool:
+        position = bisect.bisect_left(self._sorted, fingerprint)
+        return position < len(self._sorted) and self._sorted[position] == fingerprint
+
+    def filter_new(
+        self, app_key: str, comments: Iterable[CommentMetadata]
+    ) -> Tuple[List[CommentMetadata], List[int]]:
+        """Returns the comments not seen before (also deduped within the batch) and their fingerprints."""
+        new_comments, fingerprints, batch = [], [], set()
+        for comment in comments:
+            fingerprint = comment_fingerprint(app_key, comment)
+            if fingerprint in batch or fingerprint in self:
+                continue
+            batch.add(fingerprint)
+            new_comments.append(comment)
+            fingerprints.append(fingerprint)
+        return new_comments, fingerprints
+
+    def add(self, fingerprints: List[int]):
+        """Records fingerprints of comments the sink has written (journaled immediately)."""
+        if not fingerprints:
+            return
+        array("Q", fingerprints).tofile(self._journal)
+        self._journal.flush()
+        self._recent.update(fingerprints)
+        if self.compact_every and len(self._recent) >= self.compact_every:
+            # A set costs ~70 bytes per fingerprint, the sorted array 8
+            self.compact()
+
+    def compact(self):
+        """Merges the journal into the sorted index file (atomic rename) and empties the journal."""
+        # A crash between the rename and the truncate leaves merged fingerprints in the journal
+        additions = sorted(f for f in self._recent if not self._in_sorted(f))
+        if additions:
+            merged = array("Q", heapq.merge(self._sorted, additions))
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                merged.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._sorted = merged
+        self._recent = set()
+        self._journal.truncate(0)
+
+    def close(self):
+        self.compact()
+        self._journal.close()
+
+
+_index: Optional[CommentIndex] = None
+
+
+def get_comment_index() -> CommentIndex:
+    """Returns the comment index shared by this process, loading it on first use."""
+    global _index
+    if _index is None:
+        _index = CommentIndex()
+    return _index
+
+
+def close_comment_index():
+    global _index
+    if _index is not None:
+        _index.close()
+        _index = None
@@ -0,0 +1,75 @@
+import logging
+from dataclasses import dataclass, fields
+from typing import List, Optional, Tuple
+from config import AppConfig
+from services.records import CommentMetadata
+from services.schedule_service import get_crawl_history
+
+
+@dataclass(slots=True)
+class DepthPolicy:
+    """How deep to page through one app's comments. `None` limits are off."""
+
+    max_comments: Optional[int] = None
+    max_clicks: Optional[int] = None
+    max_seconds: Optional[float] = None
+    sample: str = "newest"  # "newest": keep only the first max_comments (the list is newest first); "all"
+
+    @property
+    def unlimited(self) -> bool:
+        return self.max_comments is None and self.max_clicks is None and self.max_seconds is None
+
+
+_SAMPLE_MODES = ("newest", "all")
+_OVERRIDE_KEYS = frozenset(f.name for f in fields(DepthPolicy)) | {"full_history_first"}
+
+
+def validate_depth_settings():
+    """
+    Raises ValueError for a COMMENT_DEPTH_OVERRIDES entry with an unknown key
+    or a sample mode other than "newest"/"all". Called once at startup, so a
+    typo stops the run before any app is crawled.
+    """
+    modes = {"COMMENT_SAMPLE_MODE": AppConfig.COMMENT_SAMPLE_MODE}
+    for app_key, override in AppConfig.COMMENT_DEPTH_OVERRIDES.items():
+        name = f"COMMENT_DEPTH_OVERRIDES[{app_key!r}]"
+        if not isinstance(override, dict):
+            raise ValueError(f"{name} must be a dict, got {override!r}")
+        unknown = set(override) - _OVERRIDE_KEYS
+        if unknown:
+            raise ValueError(f"Unknown {name} keys {sorted(unknown)}, expected any of {sorted(_OVERRIDE_KEYS)}")
+        if "sample" in override:
+            modes[f"{name}['sample']"] = override["sample"]
+    for name, mode in modes.items():
+        if mode not in _SAMPLE_MODES:
+            raise ValueError(f"{name} must be one of {_SAMPLE_MODES}, got {mode!r}")
+
+
+def resolve_depth_policy(app_key: str) -> DepthPolicy:
+    """
+    The COMMENT_* defaults, updated with COMMENT_DEPTH_OVERRIDES[app_key].
+    With `full_history_first`, an app whose complete history was never
+    saved gets no limits once, and the capped policy afterwards.
+    """
+    settings = {
+        "max_comments": AppConfig.COMMENT_MAX_COMMENTS,
+        "max_clicks": AppConfig.COMMENT_MAX_CLICKS,
+        "max_seconds": AppConfig.COMMENT_MAX_SECONDS,
+        "sample": AppConfig.COMMENT_SAMPLE_MODE,
+        "full_history_first": AppConfig.COMMENT_FULL_HISTORY_FIRST,
+    }
+    settings.update(AppConfig.COMMENT_DEPTH_OVERRIDES.get(app_key, {}))
+    full_history_first = settings.pop("full_history_first")
+    if full_history_first and not get_crawl_history().get(app_key).full_history:
+        logging.info(f"📜 No complete comment history of {app_key} yet, loading all comments once")
+        return DepthPolicy(sample=settings["sample"])
+    return DepthPolicy(**settings)
+
+
+def apply_sampling(
+    comments: List[CommentMetadata], policy: DepthPolicy
+) -> Tuple[List[CommentMetadata], bool]:
+    """Trims parsed comments to `max_comments` in "newest" mode. Returns (comments, trimmed)."""
+    if policy.sample == "newest" and policy.max_comments is not None and len(comments) > policy.max_comments:
+        return comments[: policy.max_comments], True
+    return comments, False
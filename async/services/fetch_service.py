@@ -1,33 +1,40 @@
 import logging
 import uuid
-from typing import List, Optional, TypedDict
-from bs4 import BeautifulSoup
+from typing import Any, Dict, List, Optional
 from config import AppConfig
-from utils.http_client import async_send_request
+from services.records import AppMetadata, CommentMetadata
+from utils.http_client import async_send_request, is_overload_error
 from utils.common import clean_text
+from utils.concurrency import fetch_limiter
+from utils.deadline import cap_timeout
+from utils.metrics import metrics
+from utils.profiling import profile_stage
 import asyncio
 
 
-class AppMetadata(TypedDict):
-    app_id: int
-    installation_counts: str
-    app_score: str
-    app_category: str
-    app_size: str
-    app_last_update: str
-    description_content: str
-    app_name: str
-    app_images: List[str]
+def _soup(html: str):
+    """Parses HTML with lxml. bs4 is imported on first use to keep startup fast."""
+    from bs4 import BeautifulSoup
 
+    return BeautifulSoup(html, "lxml")
 
-class CommentMetadata(TypedDict):
-    comment_id: int
-    username: str
-    account_id: str
-    rating: int
-    comment: str
-    comment_date: str
-    app_id: int
+
+async def _limited_request(url: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Sends a request inside a `fetch_limiter` slot, so the number of concurrent
+    fetches follows the observed latency and 429/5xx/timeout rate. The
+    timeout is capped to the current app deadline.
+    """
+    timeout = cap_timeout(timeout)  # outside the slot: a spent budget isn't an overload signal
+    async with fetch_limiter.slot() as slot:
+        with metrics.track("page_fetch"):
+            if timeout is None:
+                response_data = await async_send_request(url)
+            else:
+                response_data = await asyncio.wait_for(async_send_request(url), timeout=timeout)
+        if is_overload_error(response_data):
+            slot.record_error()
+        return response_data
 
 
 async def get_app_links(url: str) -> List[str]:
@@ -39,25 +46,23 @@ async def get_app_links(url: str) -> List[str]:
     if AppConfig.FETCH_WITH_TIMEOUT:
         try:
             # Use asyncio.wait_for to impose an overall time limit
-            response_data = await asyncio.wait_for(
-                async_send_request(url),
-                timeout=AppConfig.FETCH_APP_LINKS_TIMEOUT
-            )
+            response_data = await _limited_request(url, AppConfig.FETCH_APP_LINKS_TIMEOUT)
         except asyncio.TimeoutError:
             logging.error(f"❌ Timeout while fetching links from {url}")
             return []
     else:
-        response_data = await async_send_request(url)
+        response_data = await _limited_request(url)
 
     if "error" in response_data:
         logging.error(response_data["error"])
         return []
 
-    soup = BeautifulSoup(response_data["text"], "lxml")
+    soup = _soup(response_data["text"])
     titles = soup.find_all("a", "SimpleAppItem SimpleAppItem--single")
     return [title.get("href") for title in titles if title.get("href")]
 
 
+@profile_stage("get_app_metadata")
 async def get_app_metadata(app_url: str) -> Optional[AppMetadata]:
     """
     Fetches and parses app metadata from the app detail page.
@@ -67,73 +72,82 @@ async def get_app_metadata(app_url: str) -> Optional[AppMetadata]:
     # Optionally wrap with asyncio.wait_for to impose total time limit
     if AppConfig.FETCH_WITH_TIMEOUT:
         try:
-            response_data = await asyncio.wait_for(
-                async_send_request(app_url),
-                timeout=AppConfig.FETCH_METADATA_TIMEOUT
-            )
+            response_data = await _limited_request(app_url, AppConfig.FETCH_METADATA_TIMEOUT)
         except asyncio.TimeoutError:
             logging.error(f"❌ Timeout while fetching metadata from {app_url}")
             return None
     else:
-        response_data = await async_send_request(app_url)
+        response_data = await _limited_request(app_url)
 
     if "error" in response_data:
         logging.error(f"Error in response: {response_data['error']}")
         return None
 
     try:
-        soup = BeautifulSoup(response_data["text"], "lxml")
-        detail_page_header = soup.find("section", class_="DetailsPageHeader")
-        if not detail_page_header:
-            raise ValueError("Could not find DetailsPageHeader section.")
-
-        app_name_el = detail_page_header.find("h1", class_="AppName")
-        if not app_name_el:
-            raise ValueError("Could not find AppName in header.")
-
-        app_name = clean_text(app_name_el.text)
-
-        info_cubes_table = detail_page_header.find_all("td", class_="InfoCube__content")
-        info_cubes = [clean_text(e.text) for e in info_cubes_table]
-
-        description_div = soup.find("div", class_="AppDescriptionContent")
-        description_content = clean_text(description_div.text if description_div else "")
-
-        carousel_elements = soup.find("div", class_="carousel__inner-content")
-        if carousel_elements:
-            app_images = [
-                e.get("data-lazy-srcset") for e in carousel_elements.find_all("source")
-                if e.get("data-lazy-srcset")
-            ]
-        else:
-            app_images = []
-
-        # Example: we expect info_cubes[0..4] to exist
-        # But always check length to avoid IndexError
-        metadata = AppMetadata({
-            "app_id": int(uuid.uuid4().int % (10**8)),
-            "app_name": app_name,
-            "description_content": description_content,
-            "installation_counts": info_cubes[0] if len(info_cubes) > 0 else "",
-            "app_score": info_cubes[1] if len(info_cubes) > 1 else "",
-            "app_category": info_cubes[2] if len(info_cubes) > 2 else "",
-            "app_size": info_cubes[3] if len(info_cubes) > 3 else "",
-            "app_last_update": info_cubes[4] if len(info_cubes) > 4 else "",
-            "app_images": app_images,
-        })
-        return metadata
-
+        with metrics.track("metadata_parse"):
+            return _parse_metadata(response_data["text"])
     except Exception as error:
         logging.error(f"Error parsing metadata: {error}")
         return None
 
 
+def _parse_metadata(html: str) -> AppMetadata:
+    """Parses the app detail page into AppMetadata. Raises ValueError on unexpected markup."""
+    soup = _soup(html)
+    detail_page_header = soup.find("section", class_="DetailsPageHeader")
+    if not detail_page_header:
+        raise ValueError("Could not find DetailsPageHeader section.")
+
+    app_name_el = detail_page_header.find("h1", class_="AppName")
+    if not app_name_el:
+        raise ValueError("Could not find AppName in header.")
+
+    app_name = clean_text(app_name_el.text)
+
+    info_cubes_table = detail_page_header.find_all("td", class_="InfoCube__content")
+    info_cubes = [clean_text(e.text) for e in info_cubes_table]
+
+    description_div = soup.find("div", class_="AppDescriptionContent")
+    description_content = clean_text(description_div.text if description_div else "")
+
+    carousel_elements = soup.find("div", class_="carousel__inner-content")
+    if carousel_elements:
+        app_images = [
+            e.get("data-lazy-srcset") for e in carousel_elements.find_all("source")
+            if e.get("data-lazy-srcset")
+        ]
+    else:
+        app_images = []
+
+    # Example: we expect info_cubes[0..4] to exist
+    # But always check length to avoid IndexError
+    return AppMetadata(
+        app_id=int(uuid.uuid4().int % (10**8)),
+        app_name=app_name,
+        description_content=description_content,
+        installation_counts=info_cubes[0] if len(info_cubes) > 0 else "",
+        app_score=info_cubes[1] if len(info_cubes) > 1 else "",
+        app_category=info_cubes[2] if len(info_cubes) > 2 else "",
+        app_size=info_cubes[3] if len(info_cubes) > 3 else "",
+        app_last_update=info_cubes[4] if len(info_cubes) > 4 else "",
+        app_images=app_images,
+    )
+
+
+@profile_stage("extract_comments")
 def extract_comments(page_html: str, app_id: int) -> List[CommentMetadata]:
     """
     Extracts comments from a full HTML string (already loaded by Playwright).
     Synchronous parse is generally fast; if large, consider offloading with to_thread.
     """
-    soup = BeautifulSoup(page_html, "lxml")
+    with metrics.track("comment_parse"):
+        comments = _parse_comments(page_html, app_id)
+    metrics.comments.inc(len(comments))
+    return comments
+
+
+def _parse_comments(page_html: str, app_id: int) -> List[CommentMetadata]:
+    soup = _soup(page_html)
     app_comments_divs = soup.find_all("div", "AppComment")
 
     comments = []
@@ -151,14 +165,13 @@ def extract_comments(page_html: str, app_id: int) -> List[CommentMetadata]:
             num_str = style_val.split(":")[1][:-2]  # "80"
             rating = int(num_str) // 20  # 80 -> 4 star
 
-        comment_data = CommentMetadata({
-            "comment_id": int(uuid.uuid4().int % (10**8)),
-            "app_id": app_id,
-            "username": clean_text(username_el.text if username_el else ""),
-            "account_id": div.get("accountid", ""),
-            "rating": rating,
-            "comment": clean_text(body_el.text if body_el else ""),
-            "comment_date": clean_text(date_el.text if date_el else ""),
-        })
-        comments.append(comment_data)
+        comments.append(CommentMetadata(
+            comment_id=int(uuid.uuid4().int % (10**8)),
+            app_id=app_id,
+            username=clean_text(username_el.text if username_el else ""),
+            account_id=div.get("accountid", ""),
+            rating=rating,
+            comment=clean_text(body_el.text if body_el else ""),
+            comment_date=clean_text(date_el.text if date_el else ""),
+        ))
     return comments
@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from config import AppConfig
+from services.records import AppMetadata
+from utils.http_client import get_client, host_slot
+from utils.metrics import metrics
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def parse_srcset(srcset: str) -> List[Tuple[str, float, str]]:
+    """
+    Splits a srcset into (url, value, unit) candidates, e.g.
+    "a.webp 400w, b.webp 800w" -> [("a.webp", 400, "w"), ("b.webp", 800, "w")].
+    Candidates without a descriptor count as "1x".
+    """
+    candidates = []
+    for part in srcset.split(","):
+        tokens = part.strip().split()
+        if not tokens:
+            continue
+        url, descriptor = tokens[0], (tokens[1] if len(tokens) > 1 else "1x")
+        unit = descriptor[-1].lower()
+        try:
+            value = float(descriptor[:-1])
+        except ValueError:
+            value, unit = 1.0, "x"
+        candidates.append((url, value, unit if unit in ("w", "x") else "x"))
+    return candidates
+
+
+def pick_candidate(
+    srcset: str,
+    target_width: int = AppConfig.IMAGE_TARGET_WIDTH,
+    target_density: float = AppConfig.IMAGE_TARGET_DENSITY,
+) -> Optional[str]:
+    """
+    Picks the smallest candidate at least `target_width` wide (or the widest one),
+    or for density descriptors the largest one not above `target_density`.
+    """
+    candidates = parse_srcset(srcset)
+    if not candidates:
+        return None
+    widths = sorted((c for c in candidates if c[2] == "w"), key=lambda c: c[1])
+    if widths:
+        return next((c[0] for c in widths if c[1] >= target_width), widths[-1][0])
+    densities = sorted(candidates, key=lambda c: c[1])
+    fitting = [c for c in densities if c[1] <= target_density]
+    return (fitting[-1] if fitting else densities[0])[0]
+
+
+class ImageStore:
+    """
+    Content-addressed image files plus a SQLite index of url -> sha256/size.
+    Files live at IMAGES_FOLDER/ab/<sha256><ext>, so an image shared by
+    several apps (or URLs) is stored once.
+    """
+
+    def __init__(self, folder: str = AppConfig.IMAGES_FOLDER, index_file: str = AppConfig.IMAGE_INDEX_FILE):
+        self.folder = folder
+        os.makedirs(os.path.join(folder, "tmp"), exist_ok=True)
+        self._conn = sqlite3.connect(index_file, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS images (
+                url          TEXT PRIMARY KEY,
+                sha256       TEXT,
+                size         INTEGER,
+                content_type TEXT,
+                path         TEXT,
+                fetched_at   REAL
+            )
+            """
+        )
+
+    def lookup(self, url: str) -> Optional[Tuple[Optional[str], Optional[int], Optional[str]]]:
+        """Returns (sha256, size, path) for an indexed URL, or None."""
+        return self._conn.execute(
+            "SELECT sha256, size, path FROM images WHERE url = ?", (url,)
+        ).fetchone()
+
+    def is_stored(self, url: str, head_only: bool) -> bool:
+        row = self.lookup(url)
+        if row is None:
+            return False
+        sha256, size, path = row
+        if head_only:
+            return size is not None
+        return bool(path) and os.path.exists(os.path.join(self.folder, path))
+
+    def record(self, url: str, sha256: Optional[str], size: Optional[int],
+               content_type: Optional[str], path: Optional[str]):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?)",
+            (url, sha256, size, content_type, path, time.time()),
+        )
+
+    def temp_path(self) -> str:
+        return os.path.join(self.folder, "tmp", uuid.uuid4().hex)
+
+    def commit_file(self, tmp_path: str, sha256: str, ext: str) -> Tuple[str, bool]:
+        """Moves a downloaded file to its content address. Returns (relative path, is_new)."""
+        relative = os.path.join(sha256[:2], sha256 + ext)
+        final_path = os.path.join(self.folder, relative)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+            return relative, False
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+        return relative, True
+
+    def close(self):
+        self._conn.close()
+
+
+async def _download(store: ImageStore, url: str) -> str:
+    """Streams one image to disk while hashing it. Returns new/dedup."""
+    tmp_path = store.temp_path()
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with host_slot(url), get_client().stream("GET", url, follow_redirects=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("content-type")
+            with open(tmp_path, "wb") as f:
+                async for chunk in response.aiter_bytes(_CHUNK_SIZE):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    ext = os.path.splitext(urlparse(url).path)[1].lower()[:8]
+    relative, is_new = store.commit_file(tmp_path, digest.hexdigest(), ext)
+    store.record(url, digest.hexdigest(), size, content_type, relative)
+    metrics.bytes.inc(size, source="image")
+    return "new" if is_new else "dedup"
+
+
+async def _head(store: ImageStore, url: str) -> str:
+    """Records the size of an image without downloading it."""
+    async with host_slot(url):
+        response = await get_client().head(url, follow_redirects=True)
+    response.raise_for_status()
+    length = response.headers.get("content-length")
+    store.record(url, None, int(length) if length else None, response.headers.get("content-type"), None)
+    return "head"
+
+
+async def download_images(
+    srcsets: Iterable[str],
+    store: ImageStore,
+    head_only: bool = AppConfig.IMAGE_HEAD_ONLY,
+    concurrency: int = AppConfig.IMAGE_DOWNLOAD_CONCURRENCY,
+) -> Dict[str, int]:
+    """
+    Picks one candidate per srcset and downloads them concurrently.
+    Returns counts per outcome: new, dedup, skipped, head, failed.
+    """
+    urls = []
+    for srcset in srcsets:
+        candidate = pick_candidate(srcset)
+        if candidate:
+            urls.append(urljoin(AppConfig.MAIN_DOMAIN, candidate))
+
+    counts = {"new": 0, "dedup": 0, "skipped": 0, "head": 0, "failed": 0}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(url: str):
+        if store.is_stored(url, head_only):
+            counts["skipped"] += 1
+            return
+        async with semaphore:
+            try:
+                with metrics.track("image_head" if head_only else "image_download"):
+                    outcome = await (_head(store, url) if head_only else _download(store, url))
+                counts[outcome] += 1
+            except Exception as e:
+                counts["failed"] += 1
+                metrics.failures.inc(type="Image Error")
+                logging.warning(f"⚠️ Image download failed for {url}: {e}")
+
+    await asyncio.gather(*(fetch(url) for url in dict.fromkeys(urls)))
+    return counts
+
+
+_store: Optional[ImageStore] = None
+
+
+def get_image_store() -> ImageStore:
+    """Returns the image store shared by this process, opening it on first use."""
+    global _store
+    if _store is None:
+        _store = ImageStore()
+    return _store
+
+
+def close_image_store():
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
+
+
+async def download_app_images(app: AppMetadata) -> Dict[str, int]:
+    """Downloads (or HEADs) the screenshots of one app."""
+    counts = await download_images(app.app_images, get_image_store())
+    logging.info(
+        f"🖼️ Images for {app.app_name}: {counts['new']} new, {counts['dedup']} deduped, "
+        f"{counts['skipped']} already stored, {counts['head']} sized, {counts['failed']} failed"
+    )
+    return counts
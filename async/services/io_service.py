@@ -1,63 +1,95 @@
 import os
 import logging
-import pandas as pd
-from openpyxl import load_workbook
+from typing import List, Optional
 from config import AppConfig
+from services.ndjson_service import NdjsonSink
+from services.records import AppMetadata, CommentMetadata
+from utils.metrics import metrics
+from utils.profiling import profile_stage
+
+# openpyxl is imported inside the functions: runs that never write Excel
+# (workers, links-only runs) don't pay for importing it. Records are appended
+# row by row, so no DataFrame is built per app.
+
+
+def _new_workbook():
+    from openpyxl import Workbook
+
+    book = Workbook()
+    apps_sheet = book.active
+    apps_sheet.title = "Apps"
+    apps_sheet.append(AppMetadata.COLUMNS)
+    book.create_sheet("Comments").append(CommentMetadata.COLUMNS)
+    return book
 
 
 def create_excel_if_not_exists():
     """Ensures the Excel file is initialized with correct headers."""
     if not os.path.exists(AppConfig.EXCEL_FILE):
-        with pd.ExcelWriter(AppConfig.EXCEL_FILE, engine="openpyxl") as writer:
-            pd.DataFrame(
-                columns=[
-                    "app_id", "app_name", "description_content",
-                    "installation_counts", "app_score", "app_category",
-                    "app_size", "app_last_update", "app_images"
-                ]
-            ).to_excel(writer, sheet_name="Apps", index=False)
-
-            pd.DataFrame(
-                columns=[
-                    "comment_id", "app_id", "username", "account_id",
-                    "rating", "comment", "comment_date"
-                ]
-            ).to_excel(writer, sheet_name="Comments", index=False)
-
+        _new_workbook().save(AppConfig.EXCEL_FILE)
         logging.info(f"📁 Created new Excel file: {AppConfig.EXCEL_FILE}")
 
 
-def write_to_excel(app_df: pd.DataFrame, comments_df: pd.DataFrame):
-    """Writes app data and comments to an Excel file, appending rows without duplicating headers."""
-    file_exists = os.path.exists(AppConfig.EXCEL_FILE)
+@profile_stage("write_to_excel")
+def write_to_excel(app: AppMetadata, comments: List[CommentMetadata]):
+    """Appends one app and its comments to the Excel file (headers are written once)."""
+    from openpyxl import load_workbook
 
-    with pd.ExcelWriter(AppConfig.EXCEL_FILE, mode="a", engine="openpyxl", if_sheet_exists="overlay") as writer:
-        if file_exists:
+    with metrics.track("excel_write"):
+        if os.path.exists(AppConfig.EXCEL_FILE):
             book = load_workbook(AppConfig.EXCEL_FILE)
-
-            # If these sheets exist, find the next blank row
-            if "Apps" in book.sheetnames:
-                app_sheet = book["Apps"]
-                app_start_row = app_sheet.max_row + 0  # next row
-            else:
-                app_start_row = 0
-
-            if "Comments" in book.sheetnames:
-                comment_sheet = book["Comments"]
-                comment_start_row = comment_sheet.max_row + 0
-            else:
-                comment_start_row = 0
-
-            # Write the data without headers, starting at next row
-            app_df.to_excel(
-                writer, sheet_name="Apps", index=False,
-                header=False, startrow=app_start_row
-            )
-            comments_df.to_excel(
-                writer, sheet_name="Comments", index=False,
-                header=False, startrow=comment_start_row
-            )
         else:
-            # If the file doesn't exist for some reason, write with headers
-            app_df.to_excel(writer, sheet_name="Apps", index=False)
-            comments_df.to_excel(writer, sheet_name="Comments", index=False)
+            # If the file doesn't exist for some reason, start one with headers
+            book = _new_workbook()
+
+        for name, columns in (("Apps", AppMetadata.COLUMNS), ("Comments", CommentMetadata.COLUMNS)):
+            if name not in book.sheetnames:
+                book.create_sheet(name).append(columns)
+            elif book[name].max_column < len(columns):
+                # Files created before a column was added get its header
+                for index in range(book[name].max_column, len(columns)):
+                    book[name].cell(row=1, column=index + 1, value=columns[index])
+
+        book["Apps"].append(app.to_row())
+        comments_sheet = book["Comments"]
+        for comment in comments:
+            comments_sheet.append(comment.to_row())
+
+        book.save(AppConfig.EXCEL_FILE)
+
+
+# === Output Sinks ===
+# OUTPUT_SINKS picks where store_app writes: "excel" and/or "ndjson".
+
+_ndjson_sink: Optional[NdjsonSink] = None
+
+
+def open_sinks():
+    """Prepares every configured sink (Excel headers, NDJSON folder and manifest)."""
+    global _ndjson_sink
+    unknown = set(AppConfig.OUTPUT_SINKS) - {"excel", "ndjson"}
+    if unknown:
+        raise ValueError(f"Unknown OUTPUT_SINKS: {sorted(unknown)}")
+    if "excel" in AppConfig.OUTPUT_SINKS:
+        create_excel_if_not_exists()
+    if "ndjson" in AppConfig.OUTPUT_SINKS and _ndjson_sink is None:
+        _ndjson_sink = NdjsonSink()
+
+
+def write_records(app: AppMetadata, comments: List[CommentMetadata]):
+    """Writes one app and its comments to every configured sink."""
+    if "excel" in AppConfig.OUTPUT_SINKS:
+        write_to_excel(app, comments)
+    if "ndjson" in AppConfig.OUTPUT_SINKS:
+        if _ndjson_sink is None:
+            open_sinks()
+        with metrics.track("ndjson_write"):
+            _ndjson_sink.write(app, comments)
+
+
+def close_sinks():
+    """Finishes the open NDJSON segment."""
+    global _ndjson_sink
+    if _ndjson_sink is not None:
+        _ndjson_sink.close()
+        _ndjson_sink = None
@@ -0,0 +1,125 @@
+import gzip
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+from config import AppConfig
+from services.records import AppMetadata, CommentMetadata
+
+_SUFFIXES = {"gzip": ".ndjson.gz", "zstd": ".ndjson.zst", "none": ".ndjson"}
+# One reused encoder: json.dumps() with non-default arguments builds a new one per call
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def _open_compressed(path: str, compression: str, level: int):
+    """Binary write stream for `path`; zstd needs the optional `zstandard` package."""
+    raw = open(path, "wb")
+    if compression == "gzip":
+        return raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=level, mtime=0)
+    if compression == "zstd":
+        import zstandard
+
+        return raw, zstandard.ZstdCompressor(level=level).stream_writer(raw, closefd=False)
+    return raw, raw
+
+
+class NdjsonSink:
+    """
+    Writes one JSON line per app and per comment ({"type": "app" | "comment", ...})
+    to compressed segment files. A segment is written as `<name>.tmp`, rolled
+    after NDJSON_SEGMENT_MAX_BYTES (uncompressed) or NDJSON_SEGMENT_MAX_SECONDS,
+    then fsynced and renamed, so readers only ever see finished segments.
+    `manifest.json` lists the finished segments in order.
+    """
+
+    def __init__(
+        self,
+        folder: str = AppConfig.NDJSON_FOLDER,
+        compression: str = AppConfig.NDJSON_COMPRESSION,
+        level: int = AppConfig.NDJSON_COMPRESSION_LEVEL,
+        max_bytes: int = AppConfig.NDJSON_SEGMENT_MAX_BYTES,
+        max_seconds: float = AppConfig.NDJSON_SEGMENT_MAX_SECONDS,
+    ):
+        if compression == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                logging.warning("⚠️ NDJSON_COMPRESSION=zstd needs `pip install zstandard`, using gzip")
+                compression = "gzip"
+        if compression not in _SUFFIXES:
+            raise ValueError(f"Unknown NDJSON_COMPRESSION: {compression}")
+        self.folder = folder
+        self.compression = compression
+        self.level = level
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.manifest_path = os.path.join(folder, "manifest.json")
+        os.makedirs(folder, exist_ok=True)
+
+        self._segments: List[Dict[str, Any]] = []
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self._segments = json.load(f)["segments"]
+        leftovers = [name for name in os.listdir(folder) if name.endswith(".tmp")]
+        if leftovers:
+            logging.warning(f"⚠️ Unfinished NDJSON segments from an earlier run left as is: {leftovers}")
+
+        self._raw = self._stream = None
+        self._path: Optional[str] = None
+        self._opened_at = 0.0
+        self._records = 0
+        self._bytes = 0
+        self._sequence = len(self._segments)
+
+    def write(self, app: AppMetadata, comments: List[CommentMetadata]):
+        """Appends one app and its comments (one write call, no per-record buffering)."""
+        if self._stream is None:
+            self._open_segment()
+        columns = CommentMetadata.COLUMNS
+        lines = [_encode({"type": "app", **app.to_dict()})]
+        lines.extend(_encode({"type": "comment", **dict(zip(columns, comment.to_row()))}) for comment in comments)
+        data = ("\n".join(lines) + "\n").encode()
+        self._stream.write(data)
+        self._records += len(lines)
+        self._bytes += len(data)
+
+        if self._bytes >= self.max_bytes or time.time() - self._opened_at >= self.max_seconds:
+            self._finish_segment()
+
+    def close(self):
+        if self._stream is not None:
+            self._finish_segment()
+
+    def _open_segment(self):
+        self._sequence += 1
+        self._opened_at = time.time()
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(self._opened_at))
+        name = f"part-{stamp}-{self._sequence:06d}{_SUFFIXES[self.compression]}"
+        self._path = os.path.join(self.folder, name)
+        self._raw, self._stream = _open_compressed(self._path + ".tmp", self.compression, self.level)
+        self._records = self._bytes = 0
+
+    def _finish_segment(self):
+        if self._stream is not self._raw:
+            self._stream.close()  # flushes the compressor, leaves `raw` open
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        os.replace(self._path + ".tmp", self._path)
+
+        self._segments.append({
+            "name": os.path.basename(self._path),
+            "records": self._records,
+            "bytes": self._bytes,
+            "compressed_bytes": os.path.getsize(self._path),
+            "started": self._opened_at,
+            "finished": time.time(),
+        })
+        tmp_manifest = self.manifest_path + ".tmp"
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump({"compression": self.compression, "segments": self._segments}, f, indent=1)
+        os.replace(tmp_manifest, self.manifest_path)
+        logging.info(f"📦 Finished NDJSON segment {self._segments[-1]['name']} ({self._records} records)")
+        self._raw = self._stream = None
+        self._path = None
@@ -1,42 +1,336 @@
 import logging
 import asyncio
+import time
 import traceback
-from playwright.async_api import async_playwright
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
 from config import AppConfig
+from services.depth_service import DepthPolicy
+from utils.deadline import can_cover, cap_timeout, stage_deadline
+from utils.metrics import metrics
+from utils.system import (
+    get_child_pids,
+    get_process_tree_rss,
+    get_root_pids,
+    get_start_time,
+    kill_pids,
+)
 
+_MB = 1024 * 1024
 
-async def fetch_comments_full_page_with_timeout(url: str) -> str:
-    """Enforces a timeout for fetching the full comments page via Playwright."""
+
+class PageState:
+    """Health of one comments page, updated by the page loop and the watchdog."""
+
+    def __init__(self, url: str, context, page):
+        self.url = url
+        self.context = context
+        self.page = page
+        self.last_progress = time.monotonic()
+        self.dom_nodes = 0
+        self.heap_mb = 0.0
+        self.over_limit = False  # set by the watchdog, stops loading more comments
+
+    def touch(self):
+        self.last_progress = time.monotonic()
+
+
+class _BrowserHandle:
+    """One launched Chromium instance and the OS processes that belong to it."""
+
+    def __init__(self, browser, root_pids: Set[int]):
+        self.browser = browser
+        self.root_pids = root_pids
+        # pid -> start time when seen, so the pid isn't killed once another process reuses it
+        self.known_pids: Dict[int, Optional[float]] = {pid: get_start_time(pid) for pid in root_pids}
+        self.pages_served = 0
+        self.active = 0
+        self.retired = False
+
+    def refresh_pids(self) -> Dict[int, Optional[float]]:
+        for pid in self.root_pids:
+            self.known_pids.update((child, get_start_time(child)) for child in get_child_pids(pid))
+        return self.known_pids
+
+    def rss_mb(self) -> float:
+        return sum(get_process_tree_rss(pid) for pid in self.root_pids) / _MB
+
+
+class BrowserManager:
+    """
+    Shares one Chromium between comment pages (a fresh context per page) and
+    keeps it healthy over long runs:
+    - recycles the browser after BROWSER_MAX_PAGES pages or above
+      BROWSER_MEMORY_CEILING_MB of RSS,
+    - watches every page's DOM node count and JS heap, and stops pages that
+      grow past PAGE_MAX_DOM_NODES / PAGE_MAX_HEAP_MB from loading more,
+    - kills pages that made no progress for PAGE_STUCK_TIMEOUT seconds,
+    - relaunches a browser that crashed or disconnected,
+    - SIGKILLs Chromium processes that outlive `browser.close()`.
+    """
+
+    def __init__(self):
+        self._playwright = None
+        self._current: Optional[_BrowserHandle] = None
+        self._handles: Set[_BrowserHandle] = set()
+        self._pages: Set[PageState] = set()
+        self._lock = asyncio.Lock()
+        self._watchdog: Optional[asyncio.Task] = None
+        self._spawned_pids: Dict[int, Optional[float]] = {}
+
+    @asynccontextmanager
+    async def page(self, url: str):
+        """Yields a PageState with a fresh context/page, cleaned up on exit."""
+        handle, context = await self._new_context()
+        state = PageState(url, context, None)
+        try:
+            state.page = await context.new_page()
+            self._pages.add(state)
+            yield state
+        finally:
+            self._pages.discard(state)
+            await self._close_context(state)
+            await self._release(handle)
+
+    async def close(self):
+        """Closes every browser, stops Playwright and reaps leftover processes."""
+        if self._watchdog:
+            self._watchdog.cancel()
+            self._watchdog = None
+        for handle in list(self._handles):
+            await self._close_browser(handle)
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+        killed = kill_pids(self._spawned_pids)
+        if killed:
+            logging.warning(f"🧹 Reaped {killed} leftover Chromium processes.")
+        self._spawned_pids.clear()
+
+    async def _acquire_browser(self) -> _BrowserHandle:
+        async with self._lock:
+            if self._playwright is None:
+                # Imported here so runs that never open a browser don't load Playwright
+                from playwright.async_api import async_playwright
+
+                self._playwright = await async_playwright().start()
+                self._watchdog = asyncio.create_task(self._watch())
+
+            current = self._current
+            if current is not None and current.pages_served >= AppConfig.BROWSER_MAX_PAGES:
+                logging.info(f"♻️ Recycling browser after {current.pages_served} pages.")
+                current.retired = True
+            if current is not None and not current.browser.is_connected():
+                self._retire(current, "browser disconnected")
+            for handle in [h for h in self._handles if h.retired and h.active == 0]:
+                await self._close_browser(handle)
+            if current is None or current.retired:
+                current = self._current = await self._launch()
+
+            current.pages_served += 1
+            current.active += 1
+            return current
+
+    async def _new_context(self):
+        """Opens a context on the shared browser; one that fails to is retired and replaced once."""
+        for attempt in range(2):
+            handle = await self._acquire_browser()
+            try:
+                return handle, await handle.browser.new_context()
+            except Exception as e:
+                self._retire(handle, f"new_context() failed: {e}")
+                await self._release(handle)
+                if attempt:
+                    raise
+
+    async def _release(self, handle: _BrowserHandle):
+        handle.active -= 1
+        if handle.retired and handle.active == 0:
+            await self._close_browser(handle)
+
+    def _retire(self, handle: _BrowserHandle, reason: str):
+        """Stops handing out a browser that crashed; it is closed and reaped once its pages are done."""
+        if not handle.retired:
+            logging.warning(f"💥 Retiring browser ({reason}), the next page gets a new one.")
+        handle.retired = True
+        if self._current is handle:
+            self._current = None
+
+    async def _launch(self) -> _BrowserHandle:
+        before = set(get_child_pids())
+        browser = await self._playwright.chromium.launch(headless=AppConfig.HEADLESS_MODE)
+        handle = _BrowserHandle(browser, get_root_pids(set(get_child_pids()) - before))
+        browser.on("disconnected", lambda _: self._retire(handle, "browser disconnected"))
+        self._spawned_pids.update(handle.refresh_pids())
+        self._handles.add(handle)
+        return handle
+
+    async def _close_context(self, state: PageState):
+        browser = state.context.browser
+        if browser is not None and not browser.is_connected():
+            return  # nothing left to close, the browser is reaped with its handle
+        try:
+            await asyncio.wait_for(state.context.close(), timeout=10)
+        except Exception as e:
+            # A renderer that can't even close its context is hung; take the browser down
+            logging.warning(f"⚠️ Could not close page for {state.url}: {e}")
+            for handle in self._handles:
+                if state.context in handle.browser.contexts:
+                    handle.retired = True
+
+    async def _close_browser(self, handle: _BrowserHandle):
+        if handle not in self._handles:
+            return
+        self._handles.discard(handle)
+        handle.retired = True  # the "disconnected" event below is expected
+        if self._current is handle:
+            self._current = None
+        pids = dict(handle.refresh_pids())
+        try:
+            await asyncio.wait_for(handle.browser.close(), timeout=10)
+        except Exception as e:
+            logging.warning(f"⚠️ browser.close() failed: {e}")
+        await asyncio.sleep(0.5)  # grace period before killing what's left
+        killed = kill_pids(pids)
+        if killed:
+            logging.warning(f"🧹 Killed {killed} orphaned Chromium processes.")
+        for pid in pids:
+            self._spawned_pids.pop(pid, None)
+
+    async def _watch(self):
+        """Background watchdog for page metrics, stuck renderers and browser memory."""
+        while True:
+            await asyncio.sleep(AppConfig.WATCHDOG_INTERVAL)
+            try:
+                for state in list(self._pages):
+                    await self._check_page(state)
+                for handle in list(self._handles):
+                    self._spawned_pids.update(handle.refresh_pids())
+                    rss_mb = handle.rss_mb()
+                    if not handle.retired and rss_mb > AppConfig.BROWSER_MEMORY_CEILING_MB:
+                        logging.warning(f"♻️ Browser RSS {rss_mb:.0f} MB above ceiling, recycling.")
+                        handle.retired = True
+            except Exception as e:
+                logging.error(f"❌ Browser watchdog error: {e}")
+
+    async def _check_page(self, state: PageState):
+        stalled = time.monotonic() - state.last_progress
+        try:
+            session = await state.context.new_cdp_session(state.page)
+            try:
+                await session.send("Performance.enable")
+                page_metrics = await asyncio.wait_for(session.send("Performance.getMetrics"), timeout=5)
+            finally:
+                await session.detach()
+        except Exception:
+            page_metrics = None
+
+        if page_metrics is None or stalled > AppConfig.PAGE_STUCK_TIMEOUT:
+            if stalled > AppConfig.PAGE_STUCK_TIMEOUT:
+                logging.warning(f"🪓 Killing stuck page ({stalled:.0f}s without progress): {state.url}")
+                self._pages.discard(state)
+                await self._close_context(state)
+            return
+
+        values = {m["name"]: m["value"] for m in page_metrics.get("metrics", [])}
+        state.dom_nodes = int(values.get("Nodes", 0))
+        state.heap_mb = values.get("JSHeapUsedSize", 0) / _MB
+        if state.dom_nodes > AppConfig.PAGE_MAX_DOM_NODES or state.heap_mb > AppConfig.PAGE_MAX_HEAP_MB:
+            if not state.over_limit:
+                logging.warning(
+                    f"⚠️ Page over limits ({state.dom_nodes} nodes, {state.heap_mb:.0f} MB heap), "
+                    f"stop loading more comments: {state.url}"
+                )
+            state.over_limit = True
+
+
+# Shared by every comments page of this process
+browser_manager = BrowserManager()
+
+
+@dataclass(slots=True)
+class CommentsPage:
+    """HTML of a comments page, and why paging stopped before the end (None if it didn't)."""
+
+    html: str = ""
+    stop_reason: Optional[str] = None
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.html) and self.stop_reason is None
+
+
+async def fetch_comments_full_page_with_timeout(url: str, policy: Optional[DepthPolicy] = None) -> CommentsPage:
+    """
+    Fetches the full comments page within REFRESH_ALL_COMMENTS_PAGE_TIMEOUT
+    (capped to the app deadline). The page loop stops loading more comments
+    DEADLINE_PARSE_RESERVE seconds before that, so what it loaded is kept;
+    the timeout itself is only a backstop for a page that hangs.
+    """
     try:
-        return await asyncio.wait_for(
-            get_page_w_all_comments_html(url),
-            timeout=AppConfig.REFRESH_ALL_COMMENTS_PAGE_TIMEOUT,
-        )
+        with stage_deadline(AppConfig.REFRESH_ALL_COMMENTS_PAGE_TIMEOUT) as deadline:
+            return await asyncio.wait_for(get_page_w_all_comments_html(url, policy), timeout=deadline.budget)
     except asyncio.TimeoutError as e:
         logging.error(f"❌ Timeout: Skipping comments for {url}")
         raise TimeoutError(e)
 
 
-async def get_page_w_all_comments_html(url: str) -> str:
-    """Scrolls & clicks 'more comments' until exhausted, then returns full HTML."""
+async def get_page_w_all_comments_html(url: str, policy: Optional[DepthPolicy] = None) -> CommentsPage:
+    """Scrolls & clicks 'more comments' until exhausted or the depth policy stops it, then returns the HTML."""
     logging.info(f"🔄 Opening {url} to scrape all comments...")
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=AppConfig.HEADLESS_MODE)
-        page = await browser.new_page()
+    with metrics.track("comments_page"):
+        result = await _load_all_comments(url, policy or DepthPolicy())
+    metrics.bytes.inc(len(result.html.encode()), source="page")
+    return result
+
+
+async def _stop_reason(state: PageState, policy: DepthPolicy, clicks: int, started: float) -> Optional[str]:
+    """Why no more comments should be loaded, although the page has more."""
+    if state.over_limit:
+        return "page limits"
+    # Keep enough of the page stage (or app) deadline to read and parse what is loaded
+    if not can_cover(AppConfig.DEADLINE_PARSE_RESERVE + 3):
+        return "deadline"
+    if policy.max_clicks is not None and clicks >= policy.max_clicks:
+        return "max_clicks"
+    if policy.max_seconds is not None and time.monotonic() - started >= policy.max_seconds:
+        return "max_seconds"
+    if policy.max_comments is not None:
+        if await state.page.locator("div.AppComment").count() >= policy.max_comments:
+            return "max_comments"
+    return None
 
-        full_html = ""
+
+async def _load_all_comments(url: str, policy: DepthPolicy) -> CommentsPage:
+    result = CommentsPage()
+    async with browser_manager.page(url) as state:
+        page = state.page
         try:
             # NOTE: Page timeouts in playwright are in milliseconds
-            await page.goto(url, timeout=AppConfig.REFRESH_NO_COMMENTS_PAGE_TIMEOUT)
+            goto_timeout = cap_timeout(AppConfig.REFRESH_NO_COMMENTS_PAGE_TIMEOUT / 1000) * 1000
+            await page.goto(url, timeout=goto_timeout)
             logging.info("✅ Page loaded successfully.")
 
+            clicks = 0
+            started = time.monotonic()
             while True:
+                state.touch()
                 load_more_button = await page.query_selector(
                     "button.newbtn.AppCommentsList__loadmore"
                 )
-                if load_more_button:
+                if not load_more_button:
+                    break
+                result.stop_reason = await _stop_reason(state, policy, clicks, started)
+                if result.stop_reason:
+                    logging.info(f"✂️ Stopped loading comments after {clicks} clicks ({result.stop_reason}): {url}")
+                    break
+
+                with metrics.track("load_more_click"):
                     await load_more_button.click()
+                    clicks += 1
+                    metrics.clicks.inc()
                     if AppConfig.LOG_MORE_COMMENTS_BUTTON_CLICKED:
                         logging.info("🔄 Clicked on more comments button ...")
                     # Let new comments load
@@ -44,17 +338,13 @@ async def get_page_w_all_comments_html(url: str) -> str:
                     # Scroll to bottom
                     await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
                     await asyncio.sleep(1)
-                else:
-                    break
 
-            full_html = await page.content()
+            result.html = await page.content()
             logging.info("📥 Successfully extracted page HTML.")
 
         except Exception as e:
             logging.error(f"❌ Playwright Error on {url}: {e}")
             if AppConfig.SHOW_TRACEBACKS:
                 logging.error(traceback.format_exc())
-        finally:
-            await browser.close()
 
-        return full_html
+    return result
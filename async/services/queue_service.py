@@ -0,0 +1,264 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from config import AppConfig
+
+
+class WorkQueue:
+    """
+    Durable SQLite-backed work queue shared by the coordinator and its workers.
+
+    A worker leases a URL for `visibility_timeout` seconds. While the lease is
+    alive no other worker sees the URL; if the worker dies the lease expires
+    and the URL becomes visible again. Results are stored next to the task so
+    the coordinator can merge them once all workers are done.
+
+    Calls block while another process holds the database lock, so async
+    code runs them with `asyncio.to_thread`; a lock serializes the threads
+    on the one connection.
+    """
+
+    def __init__(
+        self,
+        path: str = AppConfig.QUEUE_FILE,
+        visibility_timeout: float = AppConfig.QUEUE_VISIBILITY_TIMEOUT,
+        max_attempts: int = AppConfig.QUEUE_MAX_ATTEMPTS,
+        shared_filesystem: bool = AppConfig.QUEUE_SHARED_FILESYSTEM,
+    ):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+
+        # isolation_level=None -> we manage transactions explicitly
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        if shared_filesystem:
+            # WAL keeps its index in shared memory, which only works for
+            # processes on one host. The rollback journal relies on file locks.
+            self._conn.execute("PRAGMA journal_mode=DELETE")
+            self._conn.execute("PRAGMA synchronous=FULL")
+        else:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                url           TEXT PRIMARY KEY,
+                status        TEXT    NOT NULL DEFAULT 'pending',
+                priority      REAL    NOT NULL DEFAULT 0,
+                attempts      INTEGER NOT NULL DEFAULT 0,
+                lease_owner   TEXT,
+                lease_expires REAL,
+                result        TEXT,
+                error         TEXT,
+                merged        INTEGER NOT NULL DEFAULT 0,
+                updated_at    REAL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, priority)"
+        )
+
+    def enqueue(self, urls: Iterable[str], priority: float = 0) -> int:
+        """Adds URLs to the queue. See `enqueue_ranked`."""
+        return self.enqueue_ranked((url, priority) for url in urls)
+
+    def enqueue_ranked(self, ranked: Iterable[Tuple[str, float]]) -> int:
+        """
+        Adds (url, priority) pairs; higher priorities are leased first.
+        Known URLs take the new priority. Finished ones (failed, or done and
+        already merged) are queued again for this run; leased ones and done
+        ones still waiting to be merged keep their state.
+        Returns the number of URLs that became pending.
+        """
+        now = time.time()
+        with self._transaction():
+            before = self._pending_count()
+            self._conn.executemany(
+                """
+                INSERT INTO tasks (url, priority, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    priority = excluded.priority,
+                    updated_at = excluded.updated_at,
+                    status = CASE WHEN {requeue} THEN 'pending' ELSE status END,
+                    attempts = CASE WHEN {requeue} THEN 0 ELSE attempts END,
+                    result = CASE WHEN {requeue} THEN NULL ELSE result END,
+                    error = CASE WHEN {requeue} THEN NULL ELSE error END,
+                    merged = CASE WHEN {requeue} THEN 0 ELSE merged END
+                """.format(requeue="(status = 'failed' OR (status = 'done' AND merged = 1))"),
+                [(url, priority, now) for url, priority in ranked],
+            )
+            return self._pending_count() - before
+
+    def _pending_count(self) -> int:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM tasks WHERE status = 'pending'").fetchone()
+        return count
+
+    def lease(self, worker_id: str) -> Optional[str]:
+        """
+        Leases the highest priority visible URL for `worker_id`.
+        Returns None when nothing is visible right now.
+
+        Expired leases count as failed attempts: a URL whose worker crashed or
+        hung on it `max_attempts` times is marked as failed instead of being
+        handed out again, so the queue always drains.
+        """
+        now = time.time()
+        with self._transaction():
+            self._conn.execute(
+                """
+                UPDATE tasks
+                SET status = 'failed', lease_owner = NULL, lease_expires = NULL, updated_at = ?,
+                    error = COALESCE(error, 'Lease expired: the worker crashed or hung.')
+                WHERE attempts >= ?
+                  AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?))
+                """,
+                (now, self.max_attempts, now),
+            )
+            row = self._conn.execute(
+                """
+                SELECT url, attempts FROM tasks
+                WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?))
+                  AND attempts < ?
+                ORDER BY priority DESC, rowid
+                LIMIT 1
+                """,
+                (now, self.max_attempts),
+            ).fetchone()
+            if row is None:
+                return None
+
+            url, attempts = row
+            self._conn.execute(
+                """
+                UPDATE tasks
+                SET status = 'leased', attempts = ?, lease_owner = ?,
+                    lease_expires = ?, updated_at = ?
+                WHERE url = ?
+                """,
+                (attempts + 1, worker_id, now + self.visibility_timeout, now, url),
+            )
+        return url
+
+    def extend(self, url: str, worker_id: str) -> bool:
+        """Pushes the lease deadline forward. False if the lease was lost."""
+        now = time.time()
+        with self._transaction():
+            cursor = self._conn.execute(
+                """
+                UPDATE tasks SET lease_expires = ?, updated_at = ?
+                WHERE url = ? AND status = 'leased' AND lease_owner = ?
+                """,
+                (now + self.visibility_timeout, now, url, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, url: str, worker_id: str, result: Dict[str, Any]):
+        """Marks a leased URL as done and stores its result."""
+        with self._transaction():
+            self._conn.execute(
+                """
+                UPDATE tasks
+                SET status = 'done', result = ?, error = NULL, lease_owner = NULL,
+                    lease_expires = NULL, updated_at = ?
+                WHERE url = ? AND lease_owner = ?
+                """,
+                (json.dumps(result, ensure_ascii=False), time.time(), url, worker_id),
+            )
+
+    def fail(
+        self, url: str, worker_id: str, error: str, priority_penalty: float = 0,
+        crawl_seconds: Optional[float] = None,
+    ):
+        """
+        Returns a failed URL to the queue (behind other URLs by
+        `priority_penalty`), or marks it as failed once it has used up
+        `max_attempts`. `crawl_seconds` of the attempt is kept for the merge.
+        """
+        attempt = None if crawl_seconds is None else json.dumps({"crawl_seconds": crawl_seconds})
+        with self._transaction():
+            self._conn.execute(
+                """
+                UPDATE tasks
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    priority = priority - ?, result = COALESCE(?, result),
+                    error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                WHERE url = ? AND lease_owner = ?
+                """,
+                (self.max_attempts, priority_penalty, attempt, error, time.time(), url, worker_id),
+            )
+
+    def unfinished_count(self) -> int:
+        """Number of URLs that are still pending or leased."""
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')"
+            ).fetchone()
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of tasks per status."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM tasks GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    def iter_unmerged_results(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yields (url, result) for finished tasks that have not been merged yet."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, result FROM tasks WHERE status = 'done' AND merged = 0 ORDER BY rowid"
+            ).fetchall()
+        for url, result in rows:
+            yield url, json.loads(result)
+
+    def iter_unmerged_failures(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yields (url, {"crawl_seconds": ...}) for failed tasks whose last attempt was timed."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT url, result FROM tasks
+                WHERE status = 'failed' AND merged = 0 AND result IS NOT NULL ORDER BY rowid
+                """
+            ).fetchall()
+        for url, result in rows:
+            yield url, json.loads(result)
+
+    def mark_merged(self, url: str):
+        with self._transaction():
+            self._conn.execute("UPDATE tasks SET merged = 1 WHERE url = ?", (url,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self):
+        return _Transaction(self._conn, self._lock)
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, so concurrent workers never lease the same URL."""
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.RLock):
+        self._conn = conn
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self._lock.release()
+            raise
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self._lock.release()
+        return False
@@ -0,0 +1,69 @@
+from dataclasses import dataclass, fields
+from typing import Any, ClassVar, Dict, List, Sequence, Tuple
+
+
+@dataclass(slots=True)
+class AppMetadata:
+    """One app row. Field order is the column order of the Apps sheet."""
+
+    app_id: int
+    app_name: str
+    description_content: str
+    installation_counts: str
+    app_score: str
+    app_category: str
+    app_size: str
+    app_last_update: str
+    app_images: List[str]
+    comments_complete: bool = False  # False if a depth policy or limit cut the comment history short
+
+    COLUMNS: ClassVar[Tuple[str, ...]] = ()
+
+    def to_row(self) -> Tuple[Any, ...]:
+        """Values in column order, ready for a sink (images as one cell)."""
+        return (
+            self.app_id, self.app_name, self.description_content,
+            self.installation_counts, self.app_score, self.app_category,
+            self.app_size, self.app_last_update, str(self.app_images),
+            self.comments_complete,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.COLUMNS}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AppMetadata":
+        # Results stored before a column was added fall back to its default
+        return cls(**{name: data[name] for name in cls.COLUMNS if name in data})
+
+
+@dataclass(slots=True)
+class CommentMetadata:
+    """
+    One comment row. Field order is the column order of the Comments sheet.
+    Slots keep it at ~100 bytes plus its strings, instead of a dict per comment.
+    """
+
+    comment_id: int
+    app_id: int
+    username: str
+    account_id: str
+    rating: int
+    comment: str
+    comment_date: str
+
+    COLUMNS: ClassVar[Tuple[str, ...]] = ()
+
+    def to_row(self) -> Tuple[Any, ...]:
+        return (
+            self.comment_id, self.app_id, self.username, self.account_id,
+            self.rating, self.comment, self.comment_date,
+        )
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "CommentMetadata":
+        return cls(*row)
+
+
+AppMetadata.COLUMNS = tuple(f.name for f in fields(AppMetadata))
+CommentMetadata.COLUMNS = tuple(f.name for f in fields(CommentMetadata))
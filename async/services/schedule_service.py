@@ -0,0 +1,160 @@
+import json
+import logging
+import math
+import os
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import AppConfig
+from services.dedupe_service import app_key_from_url
+
+_DAY = 86400
+_PERSIAN_DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789")
+_INSTALL_UNITS = (("میلیون", 1_000_000), ("هزار", 1_000), ("m", 1_000_000), ("k", 1_000))
+
+
+def parse_install_count(text: str) -> int:
+    """'+۱۰۰ هزار' / '10K+' / '1,000,000+' -> 100000 / 10000 / 1000000 (0 if unknown)."""
+    text = (text or "").translate(_PERSIAN_DIGITS).lower().replace(",", "").replace("٬", "")
+    match = re.search(r"\d+(?:\.\d+)?", text)
+    if not match:
+        return 0
+    value = float(match.group())
+    for unit, factor in _INSTALL_UNITS:
+        if unit in text:
+            value *= factor
+            break
+    return int(value)
+
+
+@dataclass(slots=True)
+class AppHistory:
+    """What past runs learned about one app."""
+
+    last_crawled: float = 0.0  # last attempt, successful or not
+    last_saved: float = 0.0  # last successful crawl, 0 in files from before it was recorded
+    crawl_seconds: Optional[float] = None  # moving average of the crawl wall time
+    comment_rate: Optional[float] = None  # moving average of new comments per day
+    installs: int = 0
+    crawls: int = 0  # successful ones
+    failures: int = 0
+    full_history: bool = False  # a crawl saved the app's complete comment history
+
+
+class CrawlHistory:
+    """
+    Per-app crawl history persisted as JSON (written atomically after every
+    app), used to rank the apps of the next run.
+    """
+
+    def __init__(self, path: str = AppConfig.CRAWL_HISTORY_FILE):
+        self.path = path
+        self.apps: Dict[str, AppHistory] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.apps = {key: AppHistory(**value) for key, value in json.load(f).items()}
+
+    def get(self, app_key: str) -> AppHistory:
+        return self.apps.get(app_key) or AppHistory()
+
+    def record(
+        self, app_key: str, crawl_seconds: Optional[float], new_comments: int, installs: int, complete: bool = False
+    ):
+        """Updates an app after a successful crawl; `new_comments` must be deduplicated."""
+        now = time.time()
+        history = self.apps.get(app_key) or AppHistory()
+        smoothing = AppConfig.SCHEDULE_SMOOTHING
+        if crawl_seconds is not None:
+            history.crawl_seconds = _smooth(history.crawl_seconds, crawl_seconds, smoothing)
+        if history.crawls:
+            # The first crawl returns the whole history, which says nothing about the rate.
+            # New comments accumulate since the last save, failed attempts don't count.
+            days = max((now - (history.last_saved or history.last_crawled)) / _DAY, 1 / 24)
+            history.comment_rate = _smooth(history.comment_rate, new_comments / days, smoothing)
+        history.last_crawled = history.last_saved = now
+        history.installs = installs or history.installs
+        history.crawls += 1
+        history.full_history = history.full_history or complete
+        self.apps[app_key] = history
+        self.save()
+
+    def record_failure(self, app_key: str, crawl_seconds: Optional[float]):
+        """
+        Updates an app after a failed or timed out crawl: its wall time counts
+        towards the cost and the attempt resets its staleness, so an app that
+        keeps failing doesn't rank first and use up every run's budget.
+        """
+        history = self.apps.get(app_key) or AppHistory()
+        if crawl_seconds is not None:
+            history.crawl_seconds = _smooth(history.crawl_seconds, crawl_seconds, AppConfig.SCHEDULE_SMOOTHING)
+        history.last_crawled = time.time()
+        history.failures += 1
+        self.apps[app_key] = history
+        self.save()
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({key: asdict(value) for key, value in self.apps.items()}, f)
+        os.replace(tmp_path, self.path)
+
+
+def _smooth(previous: Optional[float], value: float, alpha: float) -> float:
+    return value if previous is None else alpha * value + (1 - alpha) * previous
+
+
+def estimated_cost(history: AppHistory) -> float:
+    """Seconds the app is expected to take, from past runs."""
+    return history.crawl_seconds or AppConfig.SCHEDULE_DEFAULT_COST
+
+
+def score(history: AppHistory, now: Optional[float] = None) -> float:
+    """
+    Expected value of crawling the app now per second of crawl time:
+    (1 + comments expected since the last crawl) * (1 + log10(installs)) / cost.
+    Apps never crawled are treated as SCHEDULE_NEVER_CRAWLED_DAYS stale.
+    """
+    now = now or time.time()
+    if history.last_crawled:
+        stale_days = (now - history.last_crawled) / _DAY
+    else:
+        stale_days = AppConfig.SCHEDULE_NEVER_CRAWLED_DAYS
+    rate = history.comment_rate if history.comment_rate is not None else AppConfig.SCHEDULE_DEFAULT_COMMENT_RATE
+    popularity = 1 + math.log10(1 + history.installs)
+    return (1 + rate * stale_days) * popularity / max(estimated_cost(history), 1.0)
+
+
+def rank(urls: Iterable[str], history: CrawlHistory) -> List[Tuple[str, float]]:
+    """Returns (url, score) pairs, most valuable first (listing order breaks ties)."""
+    now = time.time()
+    scored = [(url, score(history.get(app_key_from_url(url)), now)) for url in urls]
+    return sorted(scored, key=lambda pair: -pair[1])
+
+
+class RunBudget:
+    """Wall-time budget of one run: apps are only started if their estimated cost still fits."""
+
+    def __init__(self, seconds: Optional[float] = AppConfig.RUN_TIME_BUDGET):
+        self.seconds = seconds
+        self.started = time.monotonic()
+
+    def remaining(self) -> float:
+        if self.seconds is None:
+            return math.inf
+        return self.seconds - (time.monotonic() - self.started)
+
+    def fits(self, cost: float) -> bool:
+        return self.remaining() >= cost
+
+
+_history: Optional[CrawlHistory] = None
+
+
+def get_crawl_history() -> CrawlHistory:
+    """Returns the crawl history shared by this process, loading it on first use."""
+    global _history
+    if _history is None:
+        _history = CrawlHistory()
+        logging.info(f"📋 Loaded crawl history of {len(_history.apps)} apps from {_history.path}")
+    return _history
@@ -0,0 +1,80 @@
+import pytest
+
+from services.aggregate_service import AggregateStore, AppAggregate
+from services.records import CommentMetadata
+
+
+def _comment(rating, date="1403/01/01"):
+    return CommentMetadata(1, 7, "user", "acc", rating, "text", date)
+
+
+def test_counts_ratings_and_days():
+    aggregate = AppAggregate("app")
+    aggregate.add([_comment(5), _comment(3), _comment(0, "1403/01/02"), _comment(9)])
+    assert aggregate.rating_counts == [1, 0, 0, 1, 0, 2]  # out of range ratings are clamped
+    assert aggregate.comment_count == 4
+    assert aggregate.rated_count == 3
+    assert aggregate.average_rating == pytest.approx(13 / 3)
+    assert aggregate.comments_per_day == {"1403/01/01": 3, "1403/01/02": 1}
+
+
+def test_average_without_rated_comments_is_none():
+    aggregate = AppAggregate("app")
+    aggregate.add([_comment(0)])
+    assert aggregate.average_rating is None
+
+
+def test_round_trip_through_dict():
+    aggregate = AppAggregate("app", app_name="App")
+    aggregate.add([_comment(4)])
+    restored = AppAggregate.from_dict("app", aggregate.to_dict())
+    assert restored == aggregate
+    assert AppAggregate.from_dict("app", {}) == AppAggregate("app")
+
+
+def test_store_totals_carry_over_between_runs(tmp_path):
+    path = str(tmp_path / "aggregates.json")
+    store = AggregateStore(path)
+    store.update("app", "App", [_comment(5)])
+    store.save()
+
+    store = AggregateStore(path)
+    aggregate = store.update("app", "App v2", [_comment(1)])
+    assert aggregate.comment_count == 2
+    assert aggregate.app_name == "App v2"
+    assert aggregate.average_rating == 3
+
+
+def test_updates_survive_a_crash_before_save(tmp_path):
+    path = str(tmp_path / "aggregates.json")
+    store = AggregateStore(path)
+    store.update("app", "App", [_comment(5)])
+    store.save()
+    store.update("app", "App", [_comment(1), _comment(3)])
+    store._journal.close()  # a crash: journaled, never saved
+
+    aggregate = AggregateStore(path).apps["app"]
+    assert aggregate.comment_count == 3
+    assert aggregate.rating_sum == 9
+
+
+def test_journal_lines_already_saved_are_not_counted_twice(tmp_path):
+    path = str(tmp_path / "aggregates.json")
+    store = AggregateStore(path)
+    store.update("app", "App", [_comment(5)])
+    with open(store.journal_path, encoding="utf-8") as f:
+        journal = f.read()
+    store.save()
+    store._journal.close()
+    with open(store.journal_path, "w", encoding="utf-8") as f:
+        f.write(journal + '{"seq": 2, "app_k')  # a crash between rename and truncate, plus a torn write
+
+    store = AggregateStore(path)
+    assert store.apps["app"].comment_count == 1
+    store.update("app", "App", [_comment(2)])
+    store._journal.close()  # the torn line must not hide this one
+
+    store = AggregateStore(path)
+    assert store.apps["app"].comment_count == 2
+    store.close()
+    assert AggregateStore(path).apps["app"].comment_count == 2
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from utils.concurrency import AdaptiveLimiter
+
+
+def _limiter(**kwargs):
+    settings = dict(initial=2, minimum=1, maximum=4, memory_ceiling_mb=None, cooldown=0)
+    settings.update(kwargs)
+    return AdaptiveLimiter("test", **settings)
+
+
+def test_never_exceeds_limit():
+    limiter = _limiter(increase_step=0)
+    peak = 0
+
+    async def task():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(task() for _ in range(10)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+def test_successes_grow_the_limit_up_to_maximum():
+    limiter = _limiter()
+
+    async def main():
+        for _ in range(50):
+            async with limiter.slot():
+                pass
+
+    asyncio.run(main())
+    assert limiter.limit == 4
+
+
+@pytest.mark.parametrize("how", ["record_error", "raise", "latency"])
+def test_errors_and_slow_slots_halve_the_limit(how):
+    limiter = _limiter(initial=4, latency_target=0.01)
+
+    async def main():
+        async with limiter.slot() as slot:
+            if how == "record_error":
+                slot.record_error()
+            elif how == "raise":
+                raise RuntimeError("boom")
+            else:
+                await asyncio.sleep(0.02)
+
+    if how == "raise":
+        with pytest.raises(RuntimeError):
+            asyncio.run(main())
+    else:
+        asyncio.run(main())
+    assert limiter.limit == 2
+
+
+def test_decreases_wait_for_cooldown_and_stop_at_minimum():
+    limiter = _limiter(initial=4, cooldown=60)
+
+    async def main():
+        for _ in range(3):
+            async with limiter.slot() as slot:
+                slot.record_error()
+
+    asyncio.run(main())
+    assert limiter.limit == 2  # only the first error counted
+
+    limiter = _limiter(initial=4)
+    asyncio.run(main())
+    assert limiter.limit == 1
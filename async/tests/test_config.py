@@ -0,0 +1,72 @@
+import importlib.util
+import logging
+import os
+
+import pytest
+
+import config
+from utils.logging_setup import RateLimitFilter
+
+SYNC_CONFIG = os.path.join(os.path.dirname(__file__), "..", "..", "sync", "config.py")
+
+
+@pytest.fixture(scope="module")
+def sync_config():
+    """sync/config.py keeps its own copies of the env parsing and the log filter."""
+    spec = importlib.util.spec_from_file_location("sync_config", SYNC_CONFIG)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize(
+    "raw, default",
+    [
+        ("true", False),
+        ("off", True),
+        ("12", 3),
+        ("0.5", 1.0),
+        ("DEBUG", logging.INFO),
+        ("{'a': {'max_comments': 5}}", {}),
+        ("excel, ndjson", ("excel",)),
+        ("120", None),
+        ("not a literal", None),
+        ("/tmp/out", "output"),
+    ],
+)
+def test_parse_env_value_matches_sync_copy(sync_config, raw, default):
+    assert config._parse_env_value(raw, default) == sync_config._parse_env_value(raw, default)
+
+
+def test_rate_limit_filter_matches_sync_copy(sync_config):
+    filters = [RateLimitFilter(limit=3, interval=60), sync_config.RateLimitFilter(limit=3, interval=60)]
+    decisions = [[], []]
+    for level in [logging.INFO] * 5 + [logging.WARNING] + [logging.DEBUG] * 2:
+        for log_filter, results in zip(filters, decisions):
+            record = logging.LogRecord("test", level, "run.py", 10, "Clicked", None, None)
+            results.append(log_filter.filter(record))
+    assert decisions[0] == decisions[1] == [True] * 3 + [False] * 2 + [True] + [False] * 2
+
+
+def _settings():
+    class Settings:
+        OUTPUT_FOLDER = "output"
+        LOG_FILE = os.path.join(OUTPUT_FOLDER, "crawler.log")
+        QUEUE_FILE = os.path.join(OUTPUT_FOLDER, "work_queue.sqlite3")
+        EXCEL_FILE = os.path.join(OUTPUT_FOLDER, "apps_data.xlsx")
+        MAIN_DOMAIN = "https://cafebazaar.ir"
+
+    return Settings
+
+
+@pytest.mark.parametrize("module_name", ["async", "sync"])
+def test_output_paths_follow_overridden_folder(monkeypatch, sync_config, module_name):
+    module = config if module_name == "async" else sync_config
+    monkeypatch.setenv("CRAWLER_OUTPUT_FOLDER", "/tmp/crawl")
+    monkeypatch.setenv("CRAWLER_EXCEL_FILE", "/data/apps.xlsx")
+    settings = _settings()
+    module.apply_env_overrides(settings)
+    assert settings.LOG_FILE == os.path.join("/tmp/crawl", "crawler.log")
+    assert settings.QUEUE_FILE == os.path.join("/tmp/crawl", "work_queue.sqlite3")
+    assert settings.EXCEL_FILE == "/data/apps.xlsx"  # overridden itself
+    assert settings.MAIN_DOMAIN == "https://cafebazaar.ir"
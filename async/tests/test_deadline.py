@@ -0,0 +1,158 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+
+from config import AppConfig
+from services import playwright_service
+from services.playwright_service import PageState
+from utils.concurrency import AdaptiveLimiter
+from utils.deadline import (
+    Deadline,
+    DeadlineExceeded,
+    app_deadline,
+    can_cover,
+    cap_timeout,
+    current_deadline,
+    deadline_paused,
+    remaining,
+    stage_deadline,
+)
+
+
+def test_no_deadline_changes_nothing():
+    assert current_deadline() is None
+    assert remaining() is None
+    assert cap_timeout(30) == 30
+    assert cap_timeout(None) is None
+    assert can_cover(10**6)
+    with app_deadline(None) as deadline:
+        assert deadline is None
+
+
+def test_cap_shrinks_timeouts_to_the_budget():
+    with app_deadline(5) as deadline:
+        assert cap_timeout(30) <= 5
+        assert cap_timeout(1) == 1
+        assert 4 < cap_timeout(None) <= 5
+        assert can_cover(1)
+        assert not can_cover(10)
+        assert deadline.exhausted
+    assert current_deadline() is None
+
+
+def test_spent_budget_raises_deadline_exceeded():
+    deadline = Deadline(0.01)
+    time.sleep(0.02)
+    with pytest.raises(DeadlineExceeded):
+        deadline.cap(30)
+    assert deadline.exhausted
+    assert issubclass(DeadlineExceeded, asyncio.TimeoutError)
+
+
+def test_paused_time_is_not_counted():
+    with app_deadline(0.05) as deadline:
+        with deadline_paused():
+            time.sleep(0.1)
+        assert deadline.remaining() > 0.03
+
+
+def test_deadline_is_per_task():
+    async def app(budget):
+        with app_deadline(budget):
+            await asyncio.sleep(0)
+            return remaining()
+
+    async def main():
+        return await asyncio.gather(app(5), app(100))
+
+    short, long = asyncio.run(main())
+    assert short <= 5 < long
+
+
+def test_waiting_for_a_limiter_slot_is_not_counted():
+    limiter = AdaptiveLimiter("test", initial=1, minimum=1, maximum=1, memory_ceiling_mb=None)
+
+    async def holder():
+        async with limiter.slot():
+            await asyncio.sleep(0.1)
+
+    async def app():
+        with app_deadline(0.05):
+            async with limiter.slot():
+                return remaining()
+
+    async def main():
+        task = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        left = await app()
+        await task
+        return left
+
+    assert asyncio.run(main()) > 0.03
+
+
+def test_stage_deadline_is_capped_to_the_app_budget():
+    with app_deadline(5) as app:
+        with stage_deadline(60) as stage:
+            assert stage.budget <= 5
+            assert not can_cover(10)
+        assert app.exhausted  # the app's budget was the tighter one
+
+    with app_deadline(60) as app:
+        with stage_deadline(5) as stage:
+            assert not can_cover(10)
+            assert stage.exhausted
+        assert not app.exhausted
+        assert current_deadline() is app
+
+
+class _FakePage:
+    """A comments page whose 'load more' button never runs out."""
+
+    def __init__(self):
+        self.clicks = 0
+
+    async def goto(self, url, timeout):
+        pass
+
+    async def query_selector(self, selector):
+        return self
+
+    async def click(self):
+        self.clicks += 1
+
+    async def wait_for_timeout(self, ms):
+        pass
+
+    async def evaluate(self, script):
+        pass
+
+    async def content(self):
+        return f"<html>{self.clicks} clicks</html>"
+
+
+class _FakeBrowserManager:
+    def __init__(self):
+        self.page_ = _FakePage()
+
+    @asynccontextmanager
+    async def page(self, url):
+        yield PageState(url, None, self.page_)
+
+
+def test_comments_page_stops_before_its_own_timeout(monkeypatch):
+    # The app budget is far above the page timeout, so only the stage deadline can stop the loop
+    monkeypatch.setattr(playwright_service, "browser_manager", _FakeBrowserManager())
+    monkeypatch.setattr(AppConfig, "REFRESH_ALL_COMMENTS_PAGE_TIMEOUT", 4)
+    monkeypatch.setattr(AppConfig, "DEADLINE_PARSE_RESERVE", 0)
+    monkeypatch.setattr(AppConfig, "LOG_MORE_COMMENTS_BUTTON_CLICKED", False)
+
+    async def main():
+        with app_deadline(30):
+            return await playwright_service.fetch_comments_full_page_with_timeout("https://x/app/a")
+
+    page = asyncio.run(main())
+    assert page.stop_reason == "deadline"
+    assert page.html.startswith("<html>") and "0 clicks" not in page.html
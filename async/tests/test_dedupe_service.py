@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from services.dedupe_service import CommentIndex, app_key_from_url, comment_fingerprint
+from services.records import CommentMetadata
+
+
+def _comment(text, account="acc-1", date="1403/01/01", comment_id=1):
+    return CommentMetadata(comment_id, 7, "user", account, 5, text, date)
+
+
+@pytest.fixture(params=[0, 1], ids=["compact-on-close", "compact-every-add"])
+def index_path(tmp_path, request):
+    return str(tmp_path / "fingerprints.bin"), request.param
+
+
+def test_app_key_ignores_host_and_trailing_slash():
+    assert app_key_from_url("https://cafebazaar.ir/app/com.example/") == "com.example"
+    assert app_key_from_url("https://cafebazaar.ir/app/com.example") == "com.example"
+
+
+def test_fingerprint_ignores_random_ids():
+    assert comment_fingerprint("app", _comment("hi", comment_id=1)) == comment_fingerprint("app", _comment("hi", comment_id=2))
+    assert comment_fingerprint("app", _comment("hi")) != comment_fingerprint("other", _comment("hi"))
+
+
+def test_filter_new_drops_seen_and_batch_duplicates(index_path):
+    path, compact_every = index_path
+    index = CommentIndex(path, compact_every=compact_every)
+    comments, fingerprints = index.filter_new("app", [_comment("a"), _comment("b"), _comment("a")])
+    assert [c.comment for c in comments] == ["a", "b"]
+    index.add(fingerprints)
+    comments, _ = index.filter_new("app", [_comment("a"), _comment("c")])
+    assert [c.comment for c in comments] == ["c"]
+    index.close()
+
+
+def test_fingerprints_survive_restart_and_crash(index_path):
+    path, compact_every = index_path
+    index = CommentIndex(path, compact_every=compact_every)
+    _, fingerprints = index.filter_new("app", [_comment("a")])
+    index.add(fingerprints)
+    index.close()  # compacted into the sorted file
+
+    index = CommentIndex(path, compact_every=compact_every)
+    _, fingerprints = index.filter_new("app", [_comment("b")])
+    index.add(fingerprints)
+    index._journal.close()  # a crash: journal written, never compacted
+
+    index = CommentIndex(path, compact_every=compact_every)
+    assert len(index) == 2
+    assert index.filter_new("app", [_comment("a"), _comment("b"), _comment("c")])[0] == [_comment("c")]
+    index.close()
+
+
+def test_torn_journal_write_is_ignored(tmp_path):
+    path = str(tmp_path / "fingerprints.bin")
+    index = CommentIndex(path)
+    index.add(index.filter_new("app", [_comment("a")])[1])
+    index._journal.write(b"\x01\x02\x03")  # partial fingerprint
+    index._journal.close()
+
+    index = CommentIndex(path)
+    assert len(index) == 1
+    index.add(index.filter_new("app", [_comment("b")])[1])  # appended after the cut, still aligned
+    index._journal.close()
+
+    index = CommentIndex(path)
+    assert len(index) == 2
+    index.close()
+
+
+def test_recent_fingerprints_are_compacted_periodically(tmp_path):
+    index = CommentIndex(str(tmp_path / "fingerprints.bin"), compact_every=3)
+    for text in "abcd":
+        index.add(index.filter_new("app", [_comment(text)])[1])
+    assert len(index._sorted) == 3 and len(index._recent) == 1
+    assert os.path.getsize(index.path) == 3 * 8
+    assert os.path.getsize(index.journal_path) == 8
+    assert index.filter_new("app", [_comment(text) for text in "abcde"])[0] == [_comment("e")]
+    index.close()
@@ -0,0 +1,75 @@
+import re
+
+import pytest
+
+from config import AppConfig
+from services import depth_service
+from services.depth_service import DepthPolicy, apply_sampling, resolve_depth_policy, validate_depth_settings
+from services.records import CommentMetadata
+from services.schedule_service import AppHistory, CrawlHistory
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    history = CrawlHistory(str(tmp_path / "history.json"))
+    monkeypatch.setattr(depth_service, "get_crawl_history", lambda: history)
+    monkeypatch.setattr(AppConfig, "COMMENT_MAX_COMMENTS", 100)
+    monkeypatch.setattr(AppConfig, "COMMENT_MAX_CLICKS", None)
+    monkeypatch.setattr(AppConfig, "COMMENT_MAX_SECONDS", 60)
+    monkeypatch.setattr(AppConfig, "COMMENT_SAMPLE_MODE", "newest")
+    monkeypatch.setattr(AppConfig, "COMMENT_FULL_HISTORY_FIRST", False)
+    monkeypatch.setattr(AppConfig, "COMMENT_DEPTH_OVERRIDES", {"big.app": {"max_comments": 10, "sample": "all"}})
+    return history
+
+
+def test_defaults_and_overrides(history):
+    assert resolve_depth_policy("some.app") == DepthPolicy(max_comments=100, max_seconds=60)
+    assert resolve_depth_policy("big.app") == DepthPolicy(max_comments=10, max_seconds=60, sample="all")
+
+
+def test_full_history_first_lifts_limits_once(history, monkeypatch):
+    monkeypatch.setattr(AppConfig, "COMMENT_FULL_HISTORY_FIRST", True)
+    assert resolve_depth_policy("some.app").unlimited
+    history.apps["some.app"] = AppHistory(full_history=True)
+    assert resolve_depth_policy("some.app") == DepthPolicy(max_comments=100, max_seconds=60)
+
+
+def _comments(count):
+    return [CommentMetadata(i, 7, "user", f"acc-{i}", 5, "text", "1403/01/01") for i in range(count)]
+
+
+@pytest.mark.parametrize(
+    "policy, kept, trimmed",
+    [
+        (DepthPolicy(max_comments=3), 3, True),
+        (DepthPolicy(max_comments=10), 5, False),
+        (DepthPolicy(max_comments=3, sample="all"), 5, False),
+        (DepthPolicy(), 5, False),
+    ],
+)
+def test_apply_sampling_keeps_the_newest(policy, kept, trimmed):
+    comments, was_trimmed = apply_sampling(_comments(5), policy)
+    assert [c.comment_id for c in comments] == list(range(kept))
+    assert was_trimmed == trimmed
+
+
+@pytest.mark.parametrize(
+    "overrides, sample_mode, message",
+    [
+        ({"a": {"max_comment": 5}}, "newest", "Unknown COMMENT_DEPTH_OVERRIDES['a'] keys ['max_comment']"),
+        ({"a": 5}, "newest", "must be a dict"),
+        ({"a": {"sample": "oldest"}}, "newest", "COMMENT_DEPTH_OVERRIDES['a']['sample'] must be one of"),
+        ({}, "random", "COMMENT_SAMPLE_MODE must be one of"),
+    ],
+)
+def test_invalid_depth_settings_are_rejected(monkeypatch, overrides, sample_mode, message):
+    monkeypatch.setattr(AppConfig, "COMMENT_DEPTH_OVERRIDES", overrides)
+    monkeypatch.setattr(AppConfig, "COMMENT_SAMPLE_MODE", sample_mode)
+    with pytest.raises(ValueError, match=re.escape(message)):
+        validate_depth_settings()
+
+
+def test_valid_depth_settings_pass(monkeypatch):
+    overrides = {"a": {"max_clicks": 3, "full_history_first": True, "sample": "all"}}
+    monkeypatch.setattr(AppConfig, "COMMENT_DEPTH_OVERRIDES", overrides)
+    validate_depth_settings()
@@ -0,0 +1,27 @@
+import pytest
+
+from services.image_service import parse_srcset, pick_candidate
+
+
+def test_parse_srcset_reads_width_and_density_descriptors():
+    assert parse_srcset("a.webp 400w, b.webp 800w") == [("a.webp", 400, "w"), ("b.webp", 800, "w")]
+    assert parse_srcset("a.png, b.png 2x") == [("a.png", 1.0, "x"), ("b.png", 2.0, "x")]
+
+
+def test_parse_srcset_tolerates_junk():
+    assert parse_srcset("") == []
+    assert parse_srcset(" , a.png big") == [("a.png", 1.0, "x")]
+
+
+@pytest.mark.parametrize(
+    "srcset, expected",
+    [
+        ("a 400w, c 1200w, b 800w", "b"),  # smallest at least the target width
+        ("a 400w, b 600w", "b"),  # nothing wide enough: the widest
+        ("a 1x, b 2x, c 3x", "b"),  # largest density not above the target
+        ("c 3x, d 4x", "c"),  # all denser than the target: the least dense
+        ("", None),
+    ],
+)
+def test_pick_candidate(srcset, expected):
+    assert pick_candidate(srcset, target_width=800, target_density=2.0) == expected
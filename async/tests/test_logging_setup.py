@@ -0,0 +1,33 @@
+import json
+import logging
+import queue
+import sys
+
+from utils.logging_setup import DeferredQueueHandler, JsonFormatter
+
+
+def _queued(record):
+    log_queue = queue.SimpleQueue()
+    DeferredQueueHandler(log_queue).handle(record)
+    return log_queue.get_nowait()
+
+
+def test_tracebacks_are_formatted_by_the_listener():
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        record = logging.LogRecord("test", logging.ERROR, __file__, 1, "failed on %s", ("app",), sys.exc_info())
+
+    queued = _queued(record)
+    assert queued.exc_info is not None and queued.exc_text is None
+    payload = json.loads(JsonFormatter().format(queued))
+    assert payload["msg"] == "failed on app"
+    assert "ZeroDivisionError" in payload["exc"]
+    assert "ZeroDivisionError" in logging.Formatter().format(queued)
+
+
+def test_args_are_merged_when_the_record_is_queued():
+    args = {"count": 1}
+    queued = _queued(logging.LogRecord("test", logging.INFO, __file__, 1, "%(count)s apps", (args,), None))
+    args["count"] = 2
+    assert queued.getMessage() == "1 apps"
@@ -0,0 +1,75 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from services.ndjson_service import NdjsonSink
+from services.records import AppMetadata, CommentMetadata
+
+
+def _app(app_id):
+    return AppMetadata(app_id, f"app {app_id}", "", "+1k", "4.5", "tools", "1 MB", "1403", ["a.png"])
+
+
+def _comments(app_id, count):
+    return [CommentMetadata(i, app_id, "user", f"acc-{i}", 4, "متن", "1403/01/01") for i in range(count)]
+
+
+def _read(folder, name):
+    with gzip.open(os.path.join(folder, name), "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_segments_roll_by_size_and_are_listed_in_manifest(tmp_path):
+    folder = str(tmp_path / "ndjson")
+    sink = NdjsonSink(folder, compression="gzip", level=6, max_bytes=1, max_seconds=3600)
+    sink.write(_app(1), _comments(1, 2))
+    sink.write(_app(2), _comments(2, 1))
+    sink.close()
+
+    with open(os.path.join(folder, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    names = [segment["name"] for segment in manifest["segments"]]
+    assert len(names) == 2
+    assert sorted(os.listdir(folder)) == sorted(names + ["manifest.json"])  # no .tmp left
+    assert [segment["records"] for segment in manifest["segments"]] == [3, 2]
+
+    records = _read(folder, names[0])
+    assert [record["type"] for record in records] == ["app", "comment", "comment"]
+    assert records[0]["app_name"] == "app 1"
+    assert records[1]["comment"] == "متن"
+
+
+def test_segment_stays_open_below_limits(tmp_path):
+    folder = str(tmp_path / "ndjson")
+    sink = NdjsonSink(folder, compression="none", level=0, max_bytes=10**6, max_seconds=3600)
+    sink.write(_app(1), [])
+    sink.write(_app(2), [])
+    assert not os.path.exists(os.path.join(folder, "manifest.json"))
+    assert [name for name in os.listdir(folder) if name.endswith(".tmp")]  # readers can't see it yet
+    sink.close()
+
+    with open(os.path.join(folder, "manifest.json"), encoding="utf-8") as f:
+        (segment,) = json.load(f)["segments"]
+    assert segment["records"] == 2
+    assert segment["name"].endswith(".ndjson")
+
+
+def test_reopening_appends_to_manifest(tmp_path):
+    folder = str(tmp_path / "ndjson")
+    for app_id in (1, 2):
+        sink = NdjsonSink(folder, compression="gzip", level=1, max_bytes=10**6, max_seconds=3600)
+        sink.write(_app(app_id), [])
+        sink.close()
+
+    with open(os.path.join(folder, "manifest.json"), encoding="utf-8") as f:
+        names = [segment["name"] for segment in json.load(f)["segments"]]
+    assert len(names) == 2
+    assert names[0].endswith("-000001.ndjson.gz") and names[1].endswith("-000002.ndjson.gz")
+    assert _read(folder, names[1])[0]["app_id"] == 2
+
+
+def test_unknown_compression_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        NdjsonSink(str(tmp_path), compression="lz4")
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from services.queue_service import WorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite3"), visibility_timeout=60, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def test_lease_order_follows_priority(queue):
+    assert queue.enqueue_ranked([("a", 1), ("b", 3), ("c", 2)]) == 3
+    assert [queue.lease("w1") for _ in range(4)] == ["b", "c", "a", None]
+
+
+def test_expired_leases_count_as_attempts(tmp_path):
+    # A negative visibility timeout makes every lease expire at once, like a crashed worker
+    queue = WorkQueue(str(tmp_path / "queue.sqlite3"), visibility_timeout=-1, max_attempts=2)
+    queue.enqueue(["a"])
+    assert queue.lease("w1") == "a"
+    assert queue.lease("w2") == "a"
+    assert queue.lease("w3") is None
+    assert queue.stats() == {"failed": 1}
+    assert queue.unfinished_count() == 0
+    queue.close()
+
+
+def test_fail_requeues_until_max_attempts(queue):
+    queue.enqueue(["a"])
+    assert queue.lease("w1") == "a"
+    queue.fail("a", "w1", "boom")
+    assert queue.stats() == {"pending": 1}
+    assert queue.lease("w1") == "a"
+    queue.fail("a", "w1", "boom")
+    assert queue.stats() == {"failed": 1}
+
+
+def test_enqueue_updates_priority_and_requeues_finished_urls(queue):
+    queue.enqueue_ranked([("done", 1), ("failed", 1), ("unmerged", 1), ("leased", 1)])
+    for url in ("done", "failed", "unmerged", "leased"):
+        assert queue.lease("w1") == url
+    queue.complete("done", "w1", {"ok": True})
+    queue.mark_merged("done")
+    queue.complete("unmerged", "w1", {"ok": True})
+    queue.fail("failed", "w1", "boom")
+    assert queue.lease("w1") == "failed"
+    queue.fail("failed", "w1", "boom")  # second attempt, now failed for good
+
+    added = queue.enqueue_ranked([("done", 5), ("failed", 9), ("unmerged", 7), ("leased", 8), ("new", 1)])
+    assert added == 3  # done, failed and new
+    assert queue.stats() == {"pending": 3, "done": 1, "leased": 1}
+    assert [queue.lease("w2") for _ in range(4)] == ["failed", "done", "new", None]
+    assert [url for url, _ in queue.iter_unmerged_results()] == ["unmerged"]
+
+
+def test_complete_stores_result_for_merge(queue):
+    queue.enqueue(["a"])
+    queue.lease("w1")
+    assert queue.extend("a", "w1")
+    assert not queue.extend("a", "w2")
+    queue.complete("a", "w1", {"app": {"app_name": "نام"}})
+    assert list(queue.iter_unmerged_results()) == [("a", {"app": {"app_name": "نام"}})]
+    queue.mark_merged("a")
+    assert list(queue.iter_unmerged_results()) == []
+
+
+@pytest.mark.parametrize("shared, journal_mode", [(False, "wal"), (True, "delete")])
+def test_journal_mode_depends_on_shared_filesystem(tmp_path, shared, journal_mode):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite3"), shared_filesystem=shared)
+    assert queue._conn.execute("PRAGMA journal_mode").fetchone()[0] == journal_mode
+    queue.close()
+
+
+def test_failed_attempts_keep_their_crawl_time_for_the_merge(queue):
+    queue.enqueue(["a", "b"])
+    for _ in range(2):
+        url = queue.lease("w1")
+        queue.fail(url, "w1", "boom", crawl_seconds=12.5)
+    assert queue.stats() == {"pending": 1, "failed": 1}
+    assert list(queue.iter_unmerged_failures()) == [("a", {"crawl_seconds": 12.5})]
+    queue.mark_merged("a")
+    assert list(queue.iter_unmerged_failures()) == []
+
+
+def test_calls_from_worker_threads_are_serialized(queue):
+    queue.enqueue(f"url-{i}" for i in range(50))
+
+    async def worker(worker_id):
+        leased = []
+        while (url := await asyncio.to_thread(queue.lease, worker_id)) is not None:
+            await asyncio.to_thread(queue.extend, url, worker_id)
+            await asyncio.to_thread(queue.complete, url, worker_id, {"ok": True})
+            leased.append(url)
+        return leased
+
+    async def main():
+        return await asyncio.gather(*(worker(f"w{i}") for i in range(8)))
+
+    leased = [url for urls in asyncio.run(main()) for url in urls]
+    assert sorted(leased) == sorted(f"url-{i}" for i in range(50))
+    assert queue.stats() == {"done": 50}
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+import run
+from services.playwright_service import CommentsPage
+from services.records import AppMetadata
+from services.schedule_service import CrawlHistory
+
+
+@pytest.fixture
+def failures(monkeypatch):
+    """Replaces the network stages with fakes; returns the failed tasks that were logged."""
+    logged = []
+
+    async def get_app_metadata(url):
+        return AppMetadata(7, "App", "", "+1k", "4.5", "tools", "1 MB", "1403", [])
+
+    monkeypatch.setattr(run, "get_app_metadata", get_app_metadata)
+    monkeypatch.setattr(run, "log_failed_task", lambda url, error_type, message: logged.append(error_type))
+    monkeypatch.setattr(run.AppConfig, "APP_DEADLINE", None)
+    return logged
+
+
+def _comments_page(html):
+    async def fetch(url, policy=None):
+        return CommentsPage(html=html)
+
+    return fetch
+
+
+def test_empty_comments_page_fails_the_app(monkeypatch, failures):
+    # e.g. a page killed by the watchdog or a browser crash
+    monkeypatch.setattr(run, "fetch_comments_full_page_with_timeout", _comments_page(""))
+    assert asyncio.run(run.crawl_app("https://x/app/a")) is None
+    assert failures == ["Comment Error"]
+
+
+def test_page_without_comments_is_a_success(monkeypatch, failures):
+    monkeypatch.setattr(run, "fetch_comments_full_page_with_timeout", _comments_page("<html></html>"))
+    app, comments = asyncio.run(run.crawl_app("https://x/app/a"))
+    assert app.app_name == "App"
+    assert comments == []
+    assert failures == []
+
+
+def test_failed_apps_are_recorded_in_the_history(tmp_path, monkeypatch, failures):
+    history = CrawlHistory(str(tmp_path / "history.json"))
+    monkeypatch.setattr(run, "get_crawl_history", lambda: history)
+    monkeypatch.setattr(run, "fetch_comments_full_page_with_timeout", _comments_page(""))
+    asyncio.run(run.process_app("https://x/app/a"))
+    assert history.get("a").failures == 1
+    assert history.get("a").crawl_seconds is not None
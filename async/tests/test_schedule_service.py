@@ -0,0 +1,99 @@
+import time
+from dataclasses import replace
+
+import pytest
+
+from services.schedule_service import (
+    AppHistory,
+    CrawlHistory,
+    RunBudget,
+    estimated_cost,
+    parse_install_count,
+    rank,
+    score,
+)
+
+_DAY = 86400
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("+۱۰۰ هزار", 100_000),
+        ("+۵ میلیون", 5_000_000),
+        ("10K+", 10_000),
+        ("1,000,000+", 1_000_000),
+        ("+1.5 میلیون", 1_500_000),
+        ("", 0),
+        (None, 0),
+        ("نامشخص", 0),
+    ],
+)
+def test_parse_install_count(text, expected):
+    assert parse_install_count(text) == expected
+
+
+def test_stale_busy_popular_cheap_apps_score_higher():
+    now = time.time()
+    base = AppHistory(last_crawled=now - _DAY, crawl_seconds=60, comment_rate=10, installs=1000, crawls=1)
+    assert score(replace(base, last_crawled=now - 10 * _DAY), now) > score(base, now)
+    assert score(replace(base, comment_rate=100), now) > score(base, now)
+    assert score(replace(base, installs=10**6), now) > score(base, now)
+    assert score(replace(base, crawl_seconds=10), now) > score(base, now)
+
+
+def test_rank_orders_by_score_and_keeps_listing_order_for_ties(tmp_path):
+    history = CrawlHistory(str(tmp_path / "history.json"))
+    history.apps["cheap"] = AppHistory(last_crawled=time.time() - _DAY, crawl_seconds=5, comment_rate=1)
+    history.apps["slow"] = AppHistory(last_crawled=time.time() - _DAY, crawl_seconds=600, comment_rate=1)
+    urls = ["https://x/app/slow", "https://x/app/new1", "https://x/app/cheap", "https://x/app/new2"]
+    ranked = [url for url, _ in rank(urls, history)]
+    assert ranked.index("https://x/app/new1") < ranked.index("https://x/app/new2")
+    assert ranked[-1] == "https://x/app/slow"
+
+
+def test_history_record_smooths_and_persists(tmp_path):
+    path = str(tmp_path / "history.json")
+    history = CrawlHistory(path)
+    history.record("app", 100, new_comments=500, installs=1000)
+    first = history.get("app")
+    assert first.crawl_seconds == 100
+    assert first.comment_rate is None  # the first crawl says nothing about the rate
+    history.record("app", 50, new_comments=0, installs=0, complete=True)
+
+    restored = CrawlHistory(path).get("app")
+    assert restored.crawl_seconds == pytest.approx(75)
+    assert restored.installs == 1000
+    assert restored.crawls == 2
+    assert restored.full_history
+    assert estimated_cost(restored) == pytest.approx(75)
+
+
+def test_run_budget():
+    assert RunBudget(None).fits(10**9)
+    budget = RunBudget(100)
+    assert budget.fits(90)
+    assert not budget.fits(200)
+
+
+def test_failed_attempts_count_towards_cost_and_staleness(tmp_path):
+    history = CrawlHistory(str(tmp_path / "history.json"))
+    history.record_failure("slow", 420)
+    failed = history.get("slow")
+    assert estimated_cost(failed) == 420
+    assert failed.last_crawled and not failed.crawls
+    assert score(failed) < score(AppHistory())  # no longer ranked like a never crawled app
+
+    history.record("slow", 100, new_comments=1000, installs=0)
+    saved = history.get("slow")
+    assert saved.comment_rate is None  # still the first successful crawl
+    assert saved.crawl_seconds == pytest.approx(260)
+    assert (saved.crawls, saved.failures) == (1, 1)
+
+
+def test_comment_rate_counts_from_the_last_save(tmp_path):
+    history = CrawlHistory(str(tmp_path / "history.json"))
+    history.apps["app"] = AppHistory(last_saved=time.time() - 10 * _DAY, last_crawled=time.time() - 10 * _DAY, crawls=1)
+    history.record_failure("app", 30)  # a failed attempt in between doesn't shorten the interval
+    history.record("app", 30, new_comments=100, installs=0)
+    assert history.get("app").comment_rate == pytest.approx(10, rel=0.01)
@@ -1,10 +1,13 @@
+import csv
 import unicodedata
 import logging
-import pandas as pd
 import os
 import traceback
 from config import AppConfig
+from utils.metrics import metrics
+from utils.profiling import profile_stage
 
+@profile_stage("clean_text")
 def clean_text(text: str) -> str:
     """
     Cleans unwanted Unicode characters and extra spaces from the text.
@@ -16,13 +19,13 @@ def clean_text(text: str) -> str:
 
 def log_failed_task(url: str, error_type: str, error_message: str):
     """Logs a failed task to CSV and optionally prints traceback."""
-    error_data = pd.DataFrame(
-        [{"url": url, "error_type": error_type, "error_message": error_message}]
-    )
+    metrics.failures.inc(type=error_type)
     file_exists = os.path.exists(AppConfig.FAILED_TASKS_FILE)
-    error_data.to_csv(
-        AppConfig.FAILED_TASKS_FILE, mode="a", index=False, header=not file_exists
-    )
+    with open(AppConfig.FAILED_TASKS_FILE, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if not file_exists:
+            writer.writerow(["url", "error_type", "error_message"])
+        writer.writerow([url, error_type, error_message])
 
     if AppConfig.SHOW_TRACEBACKS:
         logging.error(
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from config import AppConfig
+from utils.deadline import deadline_paused
+from utils.system import get_process_tree_rss
+
+
+class _SlotOutcome:
+    """Lets the caller flag a slot as failed without raising (e.g. HTTP 429)."""
+
+    __slots__ = ("error",)
+
+    def __init__(self):
+        self.error = False
+
+    def record_error(self):
+        self.error = True
+
+
+class AdaptiveLimiter:
+    """
+    AIMD (additive increase / multiplicative decrease) concurrency limiter.
+
+    Works like a semaphore whose size changes at runtime:
+    - every successful slot grows the limit by `increase_step / limit`
+      (so a full window of successes adds `increase_step`),
+    - an error, a slot slower than `latency_target` or process RSS above
+      `memory_ceiling_mb` multiplies the limit by `decrease_factor`.
+    Decreases happen at most once per `cooldown` seconds, so one burst of
+    failures doesn't collapse the limit to the minimum.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        latency_target: Optional[float] = None,
+        memory_ceiling_mb: Optional[float] = AppConfig.MEMORY_CEILING_MB,
+        increase_step: float = 1.0,
+        decrease_factor: float = 0.5,
+        cooldown: float = 2.0,
+    ):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.memory_ceiling_mb = memory_ceiling_mb
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+
+        self._limit = float(min(max(initial, minimum), maximum))
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+        self._last_decrease = 0.0
+        self._last_memory_check = 0.0
+        self._memory_exceeded = False
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @asynccontextmanager
+    async def slot(self):
+        """Waits for a free slot and reports its latency/outcome on exit."""
+        with deadline_paused():  # queueing for a slot doesn't use up the app's budget
+            async with self._condition:
+                await self._condition.wait_for(lambda: self._in_flight < self.limit)
+                self._in_flight += 1
+
+        outcome = _SlotOutcome()
+        started = time.monotonic()
+        try:
+            yield outcome
+        except BaseException:
+            outcome.error = True
+            raise
+        finally:
+            self._on_release(time.monotonic() - started, outcome.error)
+            async with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def _on_release(self, latency: float, error: bool):
+        if error:
+            self._decrease("errors")
+        elif self.latency_target is not None and latency > self.latency_target:
+            self._decrease(f"latency {latency:.1f}s")
+        elif self._over_memory_ceiling():
+            self._decrease("memory")
+        else:
+            self._set_limit(self._limit + self.increase_step / max(self._limit, 1.0))
+
+    def _decrease(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        old = self.limit
+        self._set_limit(self._limit * self.decrease_factor)
+        if self.limit != old:
+            logging.info(f"📉 {self.name} concurrency {old} → {self.limit} ({reason})")
+
+    def _set_limit(self, value: float):
+        old = self.limit
+        self._limit = min(max(value, float(self.minimum)), float(self.maximum))
+        if self.limit > old:
+            logging.debug(f"📈 {self.name} concurrency {old} → {self.limit}")
+
+    def _over_memory_ceiling(self) -> bool:
+        """Checks process tree RSS, at most once per second."""
+        if not self.memory_ceiling_mb:
+            return False
+        now = time.monotonic()
+        if now - self._last_memory_check >= 1.0:
+            self._last_memory_check = now
+            rss_mb = get_process_tree_rss() / (1024 * 1024)
+            self._memory_exceeded = rss_mb > self.memory_ceiling_mb
+        return self._memory_exceeded
+
+
+# Shared limiters for metadata fetches and Playwright pages
+fetch_limiter = AdaptiveLimiter(
+    "fetch",
+    initial=AppConfig.FETCH_CONCURRENCY_INITIAL,
+    minimum=AppConfig.FETCH_CONCURRENCY_MIN,
+    maximum=AppConfig.FETCH_CONCURRENCY_MAX,
+    latency_target=AppConfig.FETCH_LATENCY_TARGET,
+)
+browser_limiter = AdaptiveLimiter(
+    "browser",
+    initial=AppConfig.BROWSER_CONCURRENCY_INITIAL,
+    minimum=AppConfig.BROWSER_CONCURRENCY_MIN,
+    maximum=AppConfig.BROWSER_CONCURRENCY_MAX,
+    latency_target=AppConfig.BROWSER_LATENCY_TARGET,
+)
@@ -0,0 +1,115 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# Each app gets one total time budget. Stages don't stack their own timeouts
+# on top of it; they shrink them to what is left (`cap_timeout`) and skip work
+# the rest of the budget can't cover (`can_cover`). A stage that can stop
+# early on its own runs under a `stage_deadline`, so it winds down before its
+# own timeout too. Time spent waiting for a limiter slot doesn't count, since
+# every app of a run starts at once.
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised when a stage starts after its app's budget has run out."""
+
+
+class Deadline:
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires = time.monotonic() + budget
+        self.exhausted = False  # set once a stage was cut off or skipped
+
+    def remaining(self) -> float:
+        return self.expires - time.monotonic()
+
+    def cap(self, timeout: Optional[float]) -> float:
+        remaining = self.remaining()
+        if remaining <= 0:
+            self.exhausted = True
+            raise DeadlineExceeded(f"App deadline of {self.budget:.0f}s exceeded.")
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def can_cover(self, seconds: float) -> bool:
+        if self.remaining() < seconds:
+            self.exhausted = True
+            return False
+        return True
+
+    @contextmanager
+    def paused(self):
+        """Moves the deadline back by the time spent inside the block."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.expires += time.monotonic() - started
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("app_deadline", default=None)
+
+
+@contextmanager
+def app_deadline(budget: Optional[float]):
+    """Runs the block (and every task it starts) under one deadline; `None` disables it."""
+    deadline = Deadline(budget) if budget else None
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage_deadline(timeout: float):
+    """
+    Runs one stage under a deadline of `timeout` capped to the app's budget,
+    so `can_cover` inside it answers for whichever ends first. Raises
+    DeadlineExceeded if the app has no time left. The app's deadline only
+    counts as exhausted if it was the tighter one.
+    """
+    outer = _current.get()
+    budget = timeout if outer is None else outer.cap(timeout)
+    deadline = Deadline(budget)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+        if outer is not None and deadline.exhausted and budget < timeout:
+            outer.exhausted = True
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current app, or None without a deadline."""
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def cap_timeout(timeout: Optional[float]) -> Optional[float]:
+    """Shrinks `timeout` to the current app's budget. Raises DeadlineExceeded if none is left."""
+    deadline = _current.get()
+    return timeout if deadline is None else deadline.cap(timeout)
+
+
+def can_cover(seconds: float) -> bool:
+    """True if the current app has at least `seconds` left (always True without a deadline)."""
+    deadline = _current.get()
+    return deadline is None or deadline.can_cover(seconds)
+
+
+@contextmanager
+def deadline_paused():
+    """Excludes the block (e.g. waiting for a concurrency slot) from the current budget."""
+    deadline = _current.get()
+    if deadline is None:
+        yield
+    else:
+        with deadline.paused():
+            yield
@@ -1,13 +1,112 @@
 import httpx
 import asyncio
+import importlib.util
 import logging
+from contextlib import asynccontextmanager
 from typing import Any, Dict, Optional, Union
 from config import AppConfig
+from utils.deadline import DeadlineExceeded, can_cover, cap_timeout
+from utils.metrics import metrics
 
-# We define one async client at module level
-# so we don't create new clients repeatedly in each call.
-# This helps keep connections alive (persistent HTTP).
-_client = httpx.AsyncClient(timeout=AppConfig.REQUEST_TIMEOUT)
+_RETRY_DELAY = 1  # seconds
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_host_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+def create_client(config=AppConfig) -> httpx.AsyncClient:
+    """
+    Builds an AsyncClient from the HTTP_* settings: pool and keep-alive
+    limits, optional HTTP/2 (needs the `h2` package) and compression.
+    """
+    http2 = config.HTTP2_ENABLED
+    if http2 and importlib.util.find_spec("h2") is None:
+        logging.warning("⚠️ HTTP2_ENABLED needs `pip install httpx[http2]`, falling back to HTTP/1.1")
+        http2 = False
+    limits = httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    # httpx already asks for gzip/deflate (and br/zstd when their packages are installed)
+    headers = None if config.HTTP_COMPRESSION else {"Accept-Encoding": "identity"}
+    return httpx.AsyncClient(timeout=config.REQUEST_TIMEOUT, limits=limits, http2=http2, headers=headers)
+
+
+def open_client() -> httpx.AsyncClient:
+    """Opens the shared client on the running event loop (called once by each entry point)."""
+    global _client, _client_loop
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        return _client
+    if _client is not None:
+        # Its connections belong to the other loop (usually closed by now), so it
+        # can't be closed from this one; close_client() must run on its own loop
+        logging.warning(f"⚠️ Dropping the HTTP client of another event loop without closing it: {pool_stats()}")
+    _client = create_client()
+    _client_loop = asyncio.get_running_loop()
+    _host_slots.clear()
+    return _client
+
+
+async def close_client():
+    """Closes the shared client, logging its pool usage, so keep-alive connections are shut cleanly."""
+    global _client, _client_loop
+    if _client is None:
+        return
+    logging.info(f"🔌 HTTP pool at shutdown: {pool_stats()}")
+    client, _client, _client_loop = _client, None, None
+    _host_slots.clear()
+    await client.aclose()
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Returns the shared client (for streaming and HEAD requests). A client is
+    bound to the loop it was opened on, so a new one is opened on first use
+    in another loop (e.g. separate `asyncio.run` calls in the benchmarks).
+    """
+    if _client is None or _client_loop is not asyncio.get_running_loop():
+        return open_client()
+    return _client
+
+
+@asynccontextmanager
+async def host_slot(url: str):
+    """Limits concurrent requests per host to HTTP_PER_HOST_CONNECTIONS."""
+    host = httpx.URL(url).host
+    semaphore = _host_slots.get(host)
+    if semaphore is None:
+        semaphore = _host_slots[host] = asyncio.Semaphore(AppConfig.HTTP_PER_HOST_CONNECTIONS)
+    async with semaphore:
+        yield
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Connections in the shared pool (total/active/idle, HTTP/2) and requests
+    in flight per host. Also updates the `crawler_http_pool_connections` gauge.
+    """
+    connections = []
+    if _client is not None:
+        # httpx doesn't expose its pool publicly; httpcore's pool lists its connections
+        pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for connection in connections if connection.is_idle())
+    http2 = sum(1 for connection in connections if "HTTP/2" in connection.info())
+    stats = {
+        "connections": len(connections),
+        "active": len(connections) - idle,
+        "idle": idle,
+        "http2": http2,
+        "in_flight_per_host": {
+            host: AppConfig.HTTP_PER_HOST_CONNECTIONS - semaphore._value
+            for host, semaphore in _host_slots.items()
+        },
+    }
+    metrics.http_pool.set(stats["active"], state="active")
+    metrics.http_pool.set(idle, state="idle")
+    return stats
 
 
 async def async_send_request(
@@ -19,7 +118,9 @@ async def async_send_request(
     retries: int = 3,
 ) -> Dict[str, Any]:
     """
-    Sends an HTTP request using httpx with basic retry logic.
+    Sends an HTTP request using httpx with basic retry logic. Each attempt's
+    timeout is capped to the current app deadline, and no retry is started
+    that the deadline can't cover.
 
     :param url: The target URL.
     :param method: HTTP method ('GET' or 'POST').
@@ -27,27 +128,50 @@ async def async_send_request(
     :param data: Form data (for POST).
     :param headers: Custom headers.
     :param retries: Number of retries on failure.
-    :return: { 'status_code': int, 'text': str } or { 'error': str }
+    :return: { 'status_code': int, 'text': str } or { 'error': str, 'status_code': Optional[int] }
     """
     attempt = 0
+    last_status: Optional[int] = None
     while attempt < retries:
         try:
-            response = await _client.request(
-                method=method,
-                url=url,
-                params=params,
-                data=data,
-                headers=headers,
-            )
+            async with host_slot(url):
+                with metrics.track("http_request"):
+                    response = await get_client().request(
+                        method=method,
+                        url=url,
+                        params=params,
+                        data=data,
+                        headers=headers,
+                        timeout=cap_timeout(AppConfig.REQUEST_TIMEOUT),
+                    )
+            metrics.bytes.inc(len(response.content), source="http")
             # Raise an exception for 4xx/5xx status codes
             response.raise_for_status()
             return {"status_code": response.status_code, "text": response.text}
         except httpx.HTTPError as err:
             logging.warning(f"HTTP error on attempt {attempt+1}/{retries} for {url}: {err}")
+            # None for transport errors (timeouts, connection resets)
+            last_status = err.response.status_code if isinstance(err, httpx.HTTPStatusError) else None
             attempt += 1
-            await asyncio.sleep(1)  # short delay before retry
+            if attempt >= retries:
+                break
+            if not can_cover(_RETRY_DELAY + 1):
+                logging.warning(f"⏳ No time left in the app deadline to retry {url}")
+                break
+            metrics.retries.inc()
+            await asyncio.sleep(_RETRY_DELAY)  # short delay before retry
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logging.error(f"Request failed unexpectedly: {e}")
-            return {"error": str(e)}
+            return {"error": str(e), "status_code": None}
+
+    return {"error": f"Request failed after {attempt} attempts.", "status_code": last_status}
+
 
-    return {"error": f"Request failed after {retries} attempts."}
+def is_overload_error(response_data: Dict[str, Any]) -> bool:
+    """True if a failed response hints the server is overloaded (429, 5xx, timeouts)."""
+    if "error" not in response_data:
+        return False
+    status = response_data.get("status_code")
+    return status is None or status == 429 or status >= 500
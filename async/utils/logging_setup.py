@@ -0,0 +1,153 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Per-app fields (url, id, name) attached to every record logged while an app is processed
+_app_context: ContextVar[Dict[str, Any]] = ContextVar("log_app_context", default={})
+
+_listener: Optional[QueueListener] = None
+
+
+@contextmanager
+def app_log_context(**fields):
+    """Attaches `fields` to every log record emitted inside the block (per asyncio task)."""
+    token = _app_context.set({**_app_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _app_context.reset(token)
+
+
+def bind_app_log_context(**fields):
+    """Adds fields to the current app context (e.g. app_id once metadata is known)."""
+    _app_context.set({**_app_context.get(), **fields})
+
+
+class AppContextFilter(logging.Filter):
+    """Copies the per-app context onto the record before it leaves the event loop thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.app = _app_context.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `limit` INFO/DEBUG records per call site through every
+    `interval` seconds (f-strings make every message unique, so the call site
+    is the key). The next record that passes reports how many were dropped.
+    Warnings and errors are never dropped.
+    """
+
+    def __init__(self, limit: int, interval: float):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        # (pathname, lineno) -> [window start, passed in window, suppressed]
+        self._sites: Dict[Tuple[str, int], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.limit <= 0:
+            return True
+        now = time.monotonic()
+        site = self._sites.get((record.pathname, record.lineno))
+        if site is None or now - site[0] >= self.interval:
+            suppressed = site[2] if site else 0
+            self._sites[(record.pathname, record.lineno)] = [now, 1, 0]
+            if suppressed:
+                record.msg = f"{record.getMessage()} (+{suppressed} similar messages suppressed)"
+                record.args = None
+            return True
+        if site[1] < self.limit:
+            site[1] += 1
+            return True
+        site[2] += 1
+        return False
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler whose `prepare` leaves the formatting to the listener thread.
+    The stock one formats the record (traceback included) on the calling
+    thread and drops `exc_info`, so the listener could never format it itself.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # Merge the args now: they may be mutable objects that change before the listener runs
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including the per-app fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        app = getattr(record, "app", None)
+        if app:
+            payload["app"] = app
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def setup_logging(config) -> QueueListener:
+    """
+    Routes all logging through a DeferredQueueHandler: the event loop only
+    merges the message args and enqueues records, and a QueueListener thread
+    does the formatting (tracebacks included) and the file and console I/O.
+    Replaces any handlers already on the root logger.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    file_handler = logging.FileHandler(config.LOG_FILE, mode="a", encoding="utf-8")
+    file_handler.setFormatter(
+        JsonFormatter() if config.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    )
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(config.LOG_LEVEL)
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(config.LOG_RATE_LIMIT, config.LOG_RATE_LIMIT_INTERVAL))
+    queue_handler.addFilter(AppContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(config.LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flushes queued records and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
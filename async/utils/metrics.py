@@ -0,0 +1,227 @@
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Stage latencies range from milliseconds (parsing) to minutes (comment pages)
+DEFAULT_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        for key, value in self.values.items():
+            yield f"{self.name}{_format_labels(key)} {value:g}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[_label_key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+        # label key -> [per-bucket counts..., +Inf count, sum, max]
+        self.values: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] = max(series[-1], value)
+
+    def count(self, key: LabelKey) -> int:
+        return sum(self.values[key][:-2])
+
+    def quantile(self, key: LabelKey, q: float) -> float:
+        """Upper bucket bound holding the q-quantile (what Prometheus would estimate)."""
+        series = self.values[key]
+        target, seen = q * self.count(key), 0
+        for bound, bucket_count in zip(self.buckets, series):
+            seen += bucket_count
+            if seen >= target:
+                return min(bound, series[-1])
+        return series[-1]
+
+    def render(self):
+        for key, series in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {self.count(key)}"
+            yield f"{self.name}_sum{_format_labels(key)} {series[-2]:g}"
+            yield f"{self.name}_count{_format_labels(key)} {self.count(key)}"
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms reported by the crawler services."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.apps = Counter("crawler_apps_total", "Apps processed, by outcome")
+        self.comments = Counter("crawler_comments_total", "Comments extracted")
+        self.duplicates = Counter("crawler_duplicate_comments_total", "Comments dropped as already written")
+        self.bytes = Counter("crawler_bytes_total", "Bytes downloaded, by source")
+        self.retries = Counter("crawler_retries_total", "HTTP request retries")
+        self.failures = Counter("crawler_failures_total", "Failed tasks, by error type")
+        self.clicks = Counter("crawler_load_more_clicks_total", "'Load more comments' clicks")
+        self.stage_seconds = Histogram("crawler_stage_seconds", "Latency of each crawl stage")
+        self.in_flight = Gauge("crawler_in_flight", "Operations currently running, by stage")
+        self.startup_seconds = Gauge("crawler_startup_seconds", "Imports and config loading time")
+        self.http_pool = Gauge("crawler_http_pool_connections", "Connections in the HTTP pool, by state")
+
+    @property
+    def _metrics(self) -> List[_Metric]:
+        """Every metric attribute in definition order, so a new one can't be left out of the export."""
+        return [value for value in vars(self).values() if isinstance(value, _Metric)]
+
+    @contextmanager
+    def track(self, stage: str):
+        """Times a stage and counts it as in-flight while it runs."""
+        self.in_flight.inc(stage=stage)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds.observe(time.perf_counter() - started, stage=stage)
+            self.in_flight.dec(stage=stage)
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            with metric._lock:
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_file(self, path: str):
+        """Writes the Prometheus text format atomically (node_exporter textfile style)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def summary_table(self) -> str:
+        """Human readable end-of-run summary."""
+        elapsed = time.time() - self.started
+        outcomes = {
+            status: self.apps.values.get(_label_key({"status": status}), 0)
+            for status in ("ok", "failed", "deadline", "skipped")
+        }
+        lines = [
+            f"Run time: {elapsed:.1f}s | apps "
+            + ", ".join(f"{status}: {count:g}" for status, count in outcomes.items())
+            + f" ({outcomes['ok'] / elapsed * 60 if elapsed else 0:.1f} apps/min)",
+            f"Comments: {sum(self.comments.values.values()):g} | "
+            f"bytes: {sum(self.bytes.values.values()):g} | "
+            f"retries: {sum(self.retries.values.values()):g} | "
+            f"clicks: {sum(self.clicks.values.values()):g}",
+            f"{'stage':<20}{'count':>8}{'total s':>10}{'mean s':>9}{'p50 s':>8}{'p95 s':>8}{'max s':>9}",
+        ]
+        for key in sorted(self.stage_seconds.values):
+            series = self.stage_seconds.values[key]
+            count = self.stage_seconds.count(key)
+            lines.append(
+                f"{dict(key).get('stage', ''):<20}{count:>8}{series[-2]:>10.2f}"
+                f"{series[-2] / count:>9.3f}{self.stage_seconds.quantile(key, 0.5):>8.3f}"
+                f"{self.stage_seconds.quantile(key, 0.95):>8.3f}{series[-1]:>9.2f}"
+            )
+        for key, value in sorted(self.failures.values.items()):
+            lines.append(f"failures[{dict(key).get('type', '')}]: {value:g}")
+        return "\n".join(lines)
+
+
+metrics = MetricsRegistry()
+
+
+async def _serve_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Minimal HTTP handler: any GET returns the Prometheus text."""
+    try:
+        await reader.readuntil(b"\r\n\r\n")
+        body = metrics.render_prometheus().encode()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run_metrics_exporter(path: str, interval: float, http_port: Optional[int] = None):
+    """
+    Writes the metrics file every `interval` seconds (and serves /metrics on
+    localhost if `http_port` is set) until cancelled. Writes a final snapshot
+    when cancelled.
+    """
+    server = None
+    if http_port:
+        server = await asyncio.start_server(_serve_http, "127.0.0.1", http_port)
+        logging.info(f"📊 Serving metrics on http://127.0.0.1:{http_port}/metrics")
+    try:
+        while True:
+            metrics.write_prometheus_file(path)
+            await asyncio.sleep(interval)
+    finally:
+        metrics.write_prometheus_file(path)
+        if server:
+            server.close()
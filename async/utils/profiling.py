@@ -0,0 +1,159 @@
+import asyncio
+import cProfile
+import functools
+import inspect
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType
+from typing import Dict, Optional
+
+
+class Profiler:
+    """
+    Opt-in profiling for production-like runs:
+    - asyncio debug mode, which logs every callback that blocks the event loop
+      longer than `slow_callback` seconds,
+    - a sampling thread that records the main thread's stack every
+      `sample_interval` seconds and attributes it to the innermost profiled stage
+      (works for coroutines too, since a running coroutine's frame is on the stack),
+    - a cProfile collector per synchronous stage.
+
+    Results are written to `out_dir` as `<stage>.pstats`, `<stage>.collapsed`
+    and `all.collapsed` (collapsed stacks for flamegraph.pl / speedscope),
+    plus a `summary.txt` with the top functions per stage.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.out_dir = ""
+        self.sample_interval = 0.005
+        self._stage_codes: Dict[CodeType, str] = {}
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._samples: Dict[str, Counter] = {}
+        self._local = threading.local()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._main_thread_id = 0
+
+    def register(self, code: CodeType, stage: str):
+        self._stage_codes[code] = stage
+
+    def start(self, out_dir: str, sample_interval: float, slow_callback: float):
+        """Enables profiling. Call from inside the event loop to get slow-callback logs."""
+        self.enabled = True
+        self.out_dir = out_dir
+        self.sample_interval = sample_interval
+        os.makedirs(out_dir, exist_ok=True)
+
+        try:
+            loop = asyncio.get_running_loop()
+            loop.set_debug(True)
+            loop.slow_callback_duration = slow_callback
+        except RuntimeError:
+            pass  # synchronous entry point (e.g. merge), sampling only
+
+        self._main_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._sampler.start()
+        logging.info(f"🔬 Profiling enabled, results go to {out_dir}")
+
+    def stop(self):
+        """Stops sampling and writes every collected profile to `out_dir`."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+
+        summary = io.StringIO()
+        for stage, profile in self._profiles.items():
+            profile.dump_stats(os.path.join(self.out_dir, f"{stage}.pstats"))
+            summary.write(f"===== {stage} (cProfile, top 25 by cumulative time) =====\n")
+            pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(25)
+
+        total = Counter()
+        for stage, samples in self._samples.items():
+            total.update(samples)
+            self._write_collapsed(os.path.join(self.out_dir, f"{stage}.collapsed"), samples)
+            summary.write(f"===== {stage}: {sum(samples.values())} samples =====\n")
+        self._write_collapsed(os.path.join(self.out_dir, "all.collapsed"), total)
+
+        with open(os.path.join(self.out_dir, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write(summary.getvalue())
+        logging.info(f"🔬 Profiles written to {self.out_dir}")
+
+    def run_sync_stage(self, stage: str, func, args, kwargs):
+        """Runs a synchronous stage under its cProfile collector (outermost stage only)."""
+        if getattr(self._local, "active", False):
+            return func(*args, **kwargs)
+        profile = self._profiles.get(stage)
+        if profile is None:
+            profile = self._profiles[stage] = cProfile.Profile()
+        self._local.active = True
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            self._local.active = False
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self._main_thread_id)
+            if frame is None:
+                continue
+            stack, stage = [], "other"
+            while frame is not None:
+                code = frame.f_code
+                if stage == "other" and code in self._stage_codes:
+                    stage = self._stage_codes[code]  # innermost stage wins
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self._samples.setdefault(stage, Counter())[";".join(reversed(stack))] += 1
+
+    @staticmethod
+    def _write_collapsed(path: str, samples: Counter):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+profiler = Profiler()
+
+
+def profile_stage(stage: str):
+    """
+    Marks a function as a profiled stage. When profiling is off the wrapper
+    only checks a flag; when on, synchronous stages run under cProfile and
+    every stage is labelled in the sampled stacks.
+    """
+
+    def decorator(func):
+        profiler.register(func.__code__, stage)
+
+        if inspect.iscoroutinefunction(func):
+            return func  # coroutines are attributed by the sampler only
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            return profiler.run_sync_stage(stage, func, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def timestamped_profile_dir(root: str, suffix: str = "") -> str:
+    """output/profile/20240101-120000[-suffix] so runs don't overwrite each other."""
+    name = time.strftime("%Y%m%d-%H%M%S") + (f"-{suffix}" if suffix else "")
+    return os.path.join(root, name)
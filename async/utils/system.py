@@ -0,0 +1,130 @@
+import os
+import signal
+from typing import Dict, Iterable, List, Optional, Set
+
+try:
+    import psutil  # optional, used when available
+except ImportError:  # pragma: no cover - depends on the environment
+    psutil = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def get_rss_bytes(pid: Optional[int] = None) -> int:
+    """
+    Returns the resident memory of a process (default: this one) in bytes.
+    Returns 0 if the process is gone or RSS cannot be read on this platform.
+    """
+    pid = pid or os.getpid()
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return 0
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def get_child_pids(pid: Optional[int] = None) -> List[int]:
+    """Returns the pids of all descendants of a process (default: this one)."""
+    pid = pid or os.getpid()
+    if psutil is not None:
+        try:
+            return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+
+    # Fallback: build the parent -> children map from /proc
+    children = {}
+    try:
+        entries = [e for e in os.listdir("/proc") if e.isdigit()]
+    except OSError:
+        return []
+    for entry in entries:
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces, ppid is right after ") <state>"
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    result, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            result.append(child)
+            stack.append(child)
+    return result
+
+
+def get_process_tree_rss(pid: Optional[int] = None) -> int:
+    """RSS of a process plus all of its descendants (e.g. Chromium renderers)."""
+    pid = pid or os.getpid()
+    return get_rss_bytes(pid) + sum(get_rss_bytes(child) for child in get_child_pids(pid))
+
+
+def is_alive(pid: int) -> bool:
+    """True if a process with this pid still exists (zombies count as gone)."""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+        except psutil.Error:
+            return False
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            return False
+        return True
+
+
+def get_start_time(pid: int) -> Optional[float]:
+    """
+    When a process started (psutil: epoch seconds, /proc: clock ticks after
+    boot), or None if it is gone. Tells a process apart from a later one
+    that reused its pid.
+    """
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Field 22 (starttime), the 20th after ") "
+            return float(f.read().rsplit(")", 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def kill_pids(start_times: Dict[int, Optional[float]]) -> int:
+    """
+    Sends SIGKILL to every pid that is still alive and still has the start
+    time recorded when it was seen (pid -> `get_start_time()`), so a pid
+    reused by an unrelated process is left alone. Returns how many were killed.
+    """
+    killed = 0
+    for pid, started in start_times.items():
+        if started is None or not is_alive(pid) or get_start_time(pid) != started:
+            continue
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed += 1
+        except OSError:
+            pass
+    return killed
+
+
+def get_root_pids(pids: Iterable[int]) -> Set[int]:
+    """Returns the pids of a set that are not descendants of another pid in the set."""
+    pids = set(pids)
+    descendants = set()
+    for pid in pids:
+        descendants.update(get_child_pids(pid))
+    return pids - descendants
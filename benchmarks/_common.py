@@ -0,0 +1,69 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+ASYNC_DIR = os.path.join(REPO_DIR, "async")
+SYNC_DIR = os.path.join(REPO_DIR, "sync")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def use_crawler(variant_dir: str, workdir: str):
+    """
+    Makes `config`, `services`, `utils` of one crawler variant importable.
+    The crawler writes to ./output, so we move into a scratch directory first.
+    """
+    os.chdir(workdir)
+    sys.path.insert(0, variant_dir)
+
+
+def timeit(func: Callable[[], Any], number: int, repeat: int = 5) -> Dict[str, float]:
+    """Runs `func` `number` times per round; reports seconds per call."""
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - started) / number)
+    return {
+        "calls_per_round": number,
+        "rounds": repeat,
+        "best_s": min(rounds),
+        "median_s": statistics.median(rounds),
+        "mean_s": statistics.fmean(rounds),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(kind: str, results: Dict[str, Any], path: str = "") -> str:
+    """Writes results plus environment info to benchmarks/results/<kind>-<time>.json."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = path or os.path.join(RESULTS_DIR, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    payload = {
+        "kind": kind,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    print(f"Results saved to {path}")
+    return path
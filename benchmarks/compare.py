@@ -0,0 +1,50 @@
+"""
+Compares two benchmark result files.
+
+    python compare.py results/micro-OLD.json results/micro-NEW.json
+"""
+import argparse
+import json
+
+# Metrics where a larger value is better; everything else is "lower is better"
+HIGHER_IS_BETTER = {"apps_per_minute", "comments_per_second"}
+# Run settings rather than measurements
+IGNORED = {"calls_per_round", "rounds", "calls", "exit_code", "fixture"}
+
+
+def _numbers(results, prefix=""):
+    for key, value in results.items():
+        if key in IGNORED:
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _numbers(value, f"{name}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    old = dict(_numbers(baseline["results"]))
+    new = dict(_numbers(candidate["results"]))
+    print(f"{baseline['git_revision']} -> {candidate['git_revision']}")
+    print(f"{'metric':<45}{'baseline':>14}{'candidate':>14}{'change':>10}")
+    for name in sorted(old.keys() & new.keys()):
+        before, after = old[name], new[name]
+        change = (after - before) / before * 100 if before else 0.0
+        better = change > 0 if name.rsplit(".", 1)[-1] in HIGHER_IS_BETTER else change < 0
+        marker = "" if abs(change) < 1 else (" ✓" if better else " ✗")
+        print(f"{name:<45}{before:>14.6g}{after:>14.6g}{change:>+9.1f}%{marker}")
+
+
+if __name__ == "__main__":
+    main()
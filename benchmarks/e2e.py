@@ -0,0 +1,98 @@
+"""
+End-to-end benchmark: runs `async/run.py` and `sync/run.py` against the local
+fixture server and reports apps/minute, comments/second and peak RSS of the
+whole process tree (crawler + Chromium).
+
+    python e2e.py [--variants async sync] [--apps 10] [--comment-pages 5] [--latency 0.1]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import ASYNC_DIR, SYNC_DIR, save_results
+from fixture_server import LISTING_ROUTE, FixtureServer, parse_options, options_from_args
+
+sys.path.insert(0, ASYNC_DIR)
+from utils.system import get_process_tree_rss  # noqa: E402
+
+VARIANTS = {"async": ASYNC_DIR, "sync": SYNC_DIR}
+
+
+def count_rows(excel_file: str):
+    """Returns (apps, comments) rows written by a run, without headers."""
+    from openpyxl import load_workbook
+
+    if not os.path.exists(excel_file):
+        return 0, 0
+    book = load_workbook(excel_file, read_only=True)
+    try:
+        return tuple(
+            max(book[sheet].max_row - 1, 0) if sheet in book.sheetnames else 0
+            for sheet in ("Apps", "Comments")
+        )
+    finally:
+        book.close()
+
+
+def run_variant(variant_dir: str, base_url: str, timeout: float, extra_args=()):
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(
+            os.environ,
+            CRAWLER_MAIN_DOMAIN=base_url,
+            CRAWLER_APP_ROUTE=LISTING_ROUTE,
+        )
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, os.path.join(variant_dir, "run.py"), *extra_args],
+            cwd=workdir, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        peak_rss = 0
+        while process.poll() is None:
+            peak_rss = max(peak_rss, get_process_tree_rss(process.pid))
+            if time.perf_counter() - started > timeout:
+                process.kill()
+                break
+            time.sleep(0.1)
+        elapsed = time.perf_counter() - started
+
+        apps, comments = count_rows(os.path.join(workdir, "output", "apps_data.xlsx"))
+        return {
+            "exit_code": process.returncode,
+            "elapsed_s": elapsed,
+            "apps": apps,
+            "comments": comments,
+            "apps_per_minute": apps / elapsed * 60 if elapsed else 0.0,
+            "comments_per_second": comments / elapsed if elapsed else 0.0,
+            "peak_rss_mb": peak_rss / (1024 * 1024),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end crawler benchmark", add_help=False)
+    parser.add_argument("--variants", nargs="+", choices=sorted(VARIANTS), default=["async", "sync"])
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds before a run is killed")
+    parser.add_argument("--output", default="", help="Result JSON path")
+    args, rest = parser.parse_known_args()
+    server_args = parse_options(rest)
+    options = options_from_args(server_args)
+
+    results = {"fixture": vars(server_args)}
+    with FixtureServer(options) as base_url:
+        for variant in args.variants:
+            print(f"Running {variant} crawler against {base_url} ...")
+            results[variant] = run_variant(VARIANTS[variant], base_url, args.timeout)
+            r = results[variant]
+            print(
+                f"{variant:<6} {r['apps']} apps in {r['elapsed_s']:.1f}s "
+                f"({r['apps_per_minute']:.1f} apps/min), peak RSS {r['peak_rss_mb']:.0f} MB"
+            )
+
+    save_results("e2e", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
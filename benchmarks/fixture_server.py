@@ -0,0 +1,223 @@
+"""
+Local stand-in for CafeBazaar used by the benchmarks.
+
+Serves a listing page, app detail pages with a working "load more comments"
+button, comment pages behind that button and screenshot images. Pages are
+rendered from the templates in `fixtures/`; recorded pages can be served
+verbatim with `--recordings DIR` (e.g. DIR/app/com.example.html for /app/com.example).
+
+    python fixture_server.py --apps 20 --comment-pages 10 --latency 0.2
+"""
+import argparse
+import hashlib
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LISTING_ROUTE = "/lists/bench-apps"
+
+_WORDS = (
+    "عالی خوب بد برنامه کاربردی تمرین ذهن آرامش خواب استرس ممنون لطفا "
+    "بروزرسانی مشکل دارد نصب اجرا سریع کند great app love it crash please fix"
+).split()
+
+
+def _template(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@dataclass
+class FixtureOptions:
+    apps: int = 20
+    comment_pages: int = 5  # pages behind the load-more button, incl. the first one
+    comments_per_page: int = 20
+    latency: float = 0.0  # seconds added to every load-more response
+    page_latency: float = 0.0  # seconds added to listing/detail pages
+    images_per_app: int = 4
+    image_size: int = 64 * 1024
+    recordings: Optional[str] = None
+    seed: int = 42
+
+
+class FixtureSite:
+    """Renders deterministic pages for a given set of options."""
+
+    def __init__(self, options: FixtureOptions):
+        self.options = options
+        self._listing = _template("listing.html")
+        self._detail = _template("detail.html")
+        self._comment = _template("comment.html")
+
+    @staticmethod
+    def app_slug(index: int) -> str:
+        return f"com.bench.app{index}"
+
+    def listing(self) -> str:
+        apps = "\n".join(
+            f'<a class="SimpleAppItem SimpleAppItem--single" href="/app/{self.app_slug(i)}">App {i}</a>'
+            for i in range(self.options.apps)
+        )
+        return self._listing.format(apps=apps)
+
+    def detail(self, slug: str) -> str:
+        rng = random.Random(f"{self.options.seed}-{slug}")
+        images = "\n".join(
+            "<picture><source data-lazy-srcset=\""
+            + ", ".join(f"/images/{slug}-{n}-{w}.webp {w}w" for w in (200, 400, 800))
+            + "\"></picture>"
+            for n in range(self.options.images_per_app)
+        )
+        has_more = self.options.comment_pages > 1
+        return self._detail.format(
+            app_name=f"برنامه {slug}",
+            app_slug=slug,
+            installs=f"{rng.randint(1, 500)}K+",
+            description=" ".join(rng.choice(_WORDS) for _ in range(200)),
+            images=images,
+            comments=self.comments(slug, 0),
+            comment_pages=self.options.comment_pages,
+            load_more=(
+                '<button class="newbtn AppCommentsList__loadmore">نظرات بیشتر</button>'
+                if has_more else ""
+            ),
+        )
+
+    def comments(self, slug: str, page: int) -> str:
+        rng = random.Random(f"{self.options.seed}-{slug}-{page}")
+        parts = []
+        for n in range(self.options.comments_per_page):
+            parts.append(self._comment.format(
+                account_id=f"acc-{slug}-{page}-{n}",
+                username=f"کاربر {rng.randint(1, 10_000)}",
+                rating_pct=rng.randint(1, 5) * 20,
+                date=f"{rng.randint(1, 28)} مهر ۱۴۰۲",
+                body=" ".join(rng.choice(_WORDS) for _ in range(rng.randint(5, 60))),
+            ))
+        return "\n".join(parts)
+
+    def image(self, name: str) -> bytes:
+        # Deterministic bytes; the same name always yields the same content
+        block = hashlib.sha256(name.encode()).digest()
+        return (block * (self.options.image_size // len(block) + 1))[: self.options.image_size]
+
+    def recorded(self, path: str) -> Optional[bytes]:
+        if not self.options.recordings:
+            return None
+        file_path = os.path.join(self.options.recordings, path.strip("/") + ".html")
+        if os.path.isfile(file_path):
+            with open(file_path, "rb") as f:
+                return f.read()
+        return None
+
+
+def _make_handler(site: FixtureSite):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_HEAD(self):
+            self.do_GET(head_only=True)
+
+        def do_GET(self, head_only: bool = False):
+            url = urlparse(self.path)
+            path = url.path
+            options = site.options
+
+            recorded = site.recorded(path)
+            if recorded is not None:
+                return self._send(200, recorded, "text/html; charset=utf-8", head_only)
+
+            if path == LISTING_ROUTE:
+                time.sleep(options.page_latency)
+                return self._send(200, site.listing().encode(), "text/html; charset=utf-8", head_only)
+            if path.startswith("/app/"):
+                time.sleep(options.page_latency)
+                body = site.detail(path[len("/app/"):]).encode()
+                return self._send(200, body, "text/html; charset=utf-8", head_only)
+            if path.startswith("/comments/"):
+                page = int(parse_qs(url.query).get("page", ["1"])[0])
+                time.sleep(options.latency)
+                body = site.comments(path[len("/comments/"):], page).encode()
+                return self._send(200, body, "text/html; charset=utf-8", head_only)
+            if path.startswith("/images/"):
+                return self._send(200, site.image(path), "image/webp", head_only)
+            return self._send(404, b"not found", "text/plain", head_only)
+
+        def _send(self, status: int, body: bytes, content_type: str, head_only: bool):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head_only:
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # keep benchmark output clean
+
+    return Handler
+
+
+class FixtureServer:
+    """Runs the fixture site on a background thread: `with FixtureServer(opts) as base_url:`."""
+
+    def __init__(self, options: FixtureOptions, host: str = "127.0.0.1", port: int = 0):
+        self.site = FixtureSite(options)
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self.site))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> str:
+        self._thread.start()
+        return self.base_url
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def parse_options(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--apps", type=int, default=FixtureOptions.apps)
+    parser.add_argument("--comment-pages", type=int, default=FixtureOptions.comment_pages)
+    parser.add_argument("--comments-per-page", type=int, default=FixtureOptions.comments_per_page)
+    parser.add_argument("--latency", type=float, default=FixtureOptions.latency,
+                        help="Seconds added to every load-more response")
+    parser.add_argument("--page-latency", type=float, default=FixtureOptions.page_latency,
+                        help="Seconds added to listing and detail pages")
+    parser.add_argument("--recordings", default=None, help="Directory of recorded pages")
+    return parser.parse_args(argv)
+
+
+def options_from_args(args: argparse.Namespace) -> FixtureOptions:
+    return FixtureOptions(
+        apps=args.apps,
+        comment_pages=args.comment_pages,
+        comments_per_page=args.comments_per_page,
+        latency=args.latency,
+        page_latency=args.page_latency,
+        recordings=args.recordings,
+    )
+
+
+if __name__ == "__main__":
+    args = parse_options()
+    server = FixtureServer(options_from_args(args), port=args.port)
+    with server as base_url:
+        print(f"Serving fixture site on {base_url} (listing: {base_url}{LISTING_ROUTE})")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,147 @@
+"""
+Micro-benchmarks for the async crawler's hot functions:
+clean_text, extract_comments, get_app_metadata, write_to_excel and the NDJSON sink.
+
+    python micro.py [--comments 1000] [--output results.json]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from _common import ASYNC_DIR, save_results, timeit, use_crawler
+from fixture_server import FixtureOptions, FixtureServer, FixtureSite
+
+SAMPLE_TEXT = "  برنامه‌ی خیلی   خوبی است ولی‌ بعد از  بروزرسانی کند شده ۱۲۳  \n\t great app  "
+
+
+def bench_clean_text():
+    from utils.common import clean_text
+
+    return timeit(lambda: clean_text(SAMPLE_TEXT), number=20_000)
+
+
+def bench_extract_comments(site: FixtureSite, comment_count: int):
+    from services.fetch_service import extract_comments
+
+    pages = max(comment_count // site.options.comments_per_page, 1)
+    html = site.detail("com.bench.app0").replace(
+        '<div class="AppCommentsList">',
+        '<div class="AppCommentsList">' + "".join(site.comments("com.bench.app0", p) for p in range(1, pages)),
+    )
+    result = timeit(lambda: extract_comments(html, 1), number=3)
+    result["html_bytes"] = len(html.encode())
+
+    # Memory held by the returned records, and allocations made while parsing
+    gc.collect()
+    tracemalloc.start()
+    comments = extract_comments(html, 1)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["comments"] = len(comments)
+    result["retained_bytes_per_comment"] = retained / max(len(comments), 1)
+    result["peak_alloc_bytes_per_comment"] = peak / max(len(comments), 1)
+    return result
+
+
+def bench_get_app_metadata(base_url: str, calls: int):
+    from services.fetch_service import get_app_metadata
+
+    async def run():
+        # One event loop for every call: the shared HTTP client is bound to it
+        durations = []
+        for index in range(calls):
+            started = time.perf_counter()
+            metadata = await get_app_metadata(f"{base_url}/app/{FixtureSite.app_slug(index)}")
+            durations.append(time.perf_counter() - started)
+            assert metadata, "get_app_metadata returned nothing"
+        return durations
+
+    durations = asyncio.run(run())
+    durations.sort()
+    return {
+        "calls": calls,
+        "best_s": durations[0],
+        "median_s": durations[len(durations) // 2],
+        "mean_s": sum(durations) / len(durations),
+    }
+
+
+def bench_write_to_excel(site: FixtureSite, comments_per_app: int):
+    from config import AppConfig
+    from services.fetch_service import extract_comments
+    from services.io_service import create_excel_if_not_exists, write_to_excel
+    from services.records import AppMetadata
+
+    create_excel_if_not_exists()
+    app = AppMetadata(
+        app_id=1, app_name="bench", description_content="x" * 500,
+        installation_counts="10K+", app_score="4.2", app_category="bench",
+        app_size="12 MB", app_last_update="1402/07/12", app_images=["a 1x"],
+    )
+    comments = extract_comments(site.comments("com.bench.app0", 0), 1)
+    comments = (comments * (comments_per_app // max(len(comments), 1) + 1))[:comments_per_app]
+
+    result = timeit(lambda: write_to_excel(app, comments), number=5, repeat=3)
+    result["comments_per_app"] = comments_per_app
+    result["final_file_bytes"] = os.path.getsize(AppConfig.EXCEL_FILE)
+    return result
+
+
+def bench_write_ndjson(site: FixtureSite, comments_per_app: int, workdir: str):
+    from services.fetch_service import extract_comments
+    from services.ndjson_service import NdjsonSink
+    from services.records import AppMetadata
+
+    app = AppMetadata(
+        app_id=1, app_name="bench", description_content="x" * 500,
+        installation_counts="10K+", app_score="4.2", app_category="bench",
+        app_size="12 MB", app_last_update="1402/07/12", app_images=["a 1x"],
+    )
+    comments = extract_comments(site.comments("com.bench.app0", 0), 1)
+    comments = (comments * (comments_per_app // max(len(comments), 1) + 1))[:comments_per_app]
+
+    sink = NdjsonSink(folder=os.path.join(workdir, "ndjson"))
+    result = timeit(lambda: sink.write(app, comments), number=20, repeat=5)
+    sink.close()
+    result["records_per_call"] = comments_per_app + 1
+    result["records_per_s"] = (comments_per_app + 1) / result["median_s"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawler micro-benchmarks")
+    parser.add_argument("--comments", type=int, default=1000, help="Comments on the parsed page")
+    parser.add_argument("--metadata-calls", type=int, default=20)
+    parser.add_argument("--excel-comments", type=int, default=100, help="Comments per written app")
+    parser.add_argument("--output", default="", help="Result JSON path")
+    args = parser.parse_args()
+
+    options = FixtureOptions(apps=args.metadata_calls)
+    results = {}
+    os.environ.setdefault("CRAWLER_LOG_LEVEL", "WARNING")  # keep per-call logs out of the output
+    with tempfile.TemporaryDirectory() as workdir, FixtureServer(options) as base_url:
+        use_crawler(ASYNC_DIR, workdir)
+        from config import AppConfig
+
+        AppConfig.load()
+        site = FixtureSite(options)
+
+        for name, run in (
+            ("clean_text", bench_clean_text),
+            ("extract_comments", lambda: bench_extract_comments(site, args.comments)),
+            ("get_app_metadata", lambda: bench_get_app_metadata(base_url, args.metadata_calls)),
+            ("write_to_excel", lambda: bench_write_to_excel(site, args.excel_comments)),
+            ("write_ndjson", lambda: bench_write_ndjson(site, args.comments, workdir)),
+        ):
+            results[name] = run()
+            print(f"{name:<20} median {results[name]['median_s'] * 1000:10.3f} ms/call")
+
+    save_results("micro", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
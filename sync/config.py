@@ -1,9 +1,20 @@
+import ast
+import atexit
 import os
 import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
 
 
 class AppConfig:
-    """Configuration class for modifying behaviour of  the crawler."""
+    """
+    Configuration class for modifying behaviour of  the crawler.
+
+    Importing this module has no side effects. Every setting can be overridden
+    with a `CRAWLER_<NAME>` environment variable; `AppConfig.load()` must be
+    called once at startup to create the output folder and configure logging.
+    """
 
     # Directories
     OUTPUT_FOLDER = (
@@ -11,12 +22,12 @@ class AppConfig:
     )
     FAILED_TASKS_FILE = os.path.join(OUTPUT_FOLDER, "failed_tasks.csv")
 
-    os.makedirs(OUTPUT_FOLDER, exist_ok=True)  # Ensure output folder exists
-
     # Logging Configuration
     SHOW_TRACEBACKS = False  # Set to False to hide detailed error logs
     LOG_FILE = os.path.join(OUTPUT_FOLDER, "crawler.log")
     LOG_LEVEL = logging.INFO  # Change to DEBUG if needed
+    LOG_RATE_LIMIT = 50  # INFO/DEBUG lines per call site per interval, 0 disables
+    LOG_RATE_LIMIT_INTERVAL = 10  # seconds
 
     # Excel File Path
     EXCEL_FILE = os.path.join(OUTPUT_FOLDER, "apps_data.xlsx")
@@ -43,26 +54,134 @@ class AppConfig:
     MAX_RETRIES = 3
     REQUEST_TIMEOUT = 10
 
+    _loaded = False
+
+    @classmethod
+    def load(cls):
+        """Creates the output folder and configures logging. Safe to call more than once."""
+        if cls._loaded:
+            return cls
+        os.makedirs(cls.OUTPUT_FOLDER, exist_ok=True)  # Ensure output folder exists
+        configure_logging(cls)
+        cls._loaded = True
+        # Log all configurations on startup
+        cls.log_config()
+        return cls
+
     @classmethod
     def log_config(cls):
         logging.info("🔧 Configuration loaded successfully:")
 
 
-# **Initialize Logging** (Ensures logging is set up before main runs)
-logging.basicConfig(
-    filename=AppConfig.LOG_FILE,
-    level=AppConfig.LOG_LEVEL,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    filemode="a",
-)
-
-# Also log to console
-console_handler = logging.StreamHandler()
-console_handler.setLevel(AppConfig.LOG_LEVEL)
-console_handler.setFormatter(
-    logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-)
-logging.getLogger().addHandler(console_handler)
-
-# Log all configurations on startup
-AppConfig.log_config()
+# _parse_env_value, apply_env_overrides and RateLimitFilter are copies of the
+# async crawler's; async/tests/test_config.py checks that they behave the same.
+
+
+def _parse_env_value(raw: str, default):
+    """Converts an environment string to the type of the setting's default."""
+    if isinstance(default, bool):
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, (int, float)):
+        try:
+            return type(default)(raw)
+        except ValueError:
+            level = logging.getLevelName(raw.strip().upper())  # e.g. CRAWLER_LOG_LEVEL=DEBUG
+            if isinstance(level, int):
+                return level
+            raise
+    if isinstance(default, dict):
+        return ast.literal_eval(raw)
+    if isinstance(default, (tuple, list)):
+        return tuple(item.strip() for item in raw.split(",") if item.strip())  # e.g. "excel,ndjson"
+    if default is None:
+        try:
+            return ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            return raw
+    return raw
+
+
+def apply_env_overrides(config=AppConfig, prefix: str = "CRAWLER_"):
+    """
+    Overrides settings from `CRAWLER_<NAME>` environment variables. Paths
+    under the default OUTPUT_FOLDER follow an overridden one, unless they
+    were overridden themselves.
+    """
+    default_folder = config.OUTPUT_FOLDER
+    overridden = set()
+    for name, default in vars(config).items():
+        raw = os.environ.get(prefix + name) if name.isupper() else None
+        if raw is not None:
+            setattr(config, name, _parse_env_value(raw, default))
+            overridden.add(name)
+    if config.OUTPUT_FOLDER != default_folder:
+        _move_output_paths(config, default_folder, exclude=overridden)
+
+
+def _move_output_paths(config, old_folder: str, exclude=()):
+    """Re-derives settings like LOG_FILE = "<old_folder>/crawler.log" from OUTPUT_FOLDER."""
+    for name, value in list(vars(config).items()):
+        if name.isupper() and name not in exclude and isinstance(value, str) and value.startswith(old_folder + os.sep):
+            setattr(config, name, os.path.join(config.OUTPUT_FOLDER, os.path.relpath(value, old_folder)))
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `limit` INFO/DEBUG records per call site through every
+    `interval` seconds (e.g. the 'Clicked on more comments' line).
+    Warnings and errors are never dropped.
+    """
+
+    def __init__(self, limit: int, interval: float):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._sites = {}  # (pathname, lineno) -> [window start, passed, suppressed]
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.limit <= 0:
+            return True
+        now = time.monotonic()
+        site = self._sites.get((record.pathname, record.lineno))
+        if site is None or now - site[0] >= self.interval:
+            suppressed = site[2] if site else 0
+            self._sites[(record.pathname, record.lineno)] = [now, 1, 0]
+            if suppressed:
+                record.msg = f"{record.getMessage()} (+{suppressed} similar messages suppressed)"
+                record.args = None
+            return True
+        if site[1] < self.limit:
+            site[1] += 1
+            return True
+        site[2] += 1
+        return False
+
+
+def configure_logging(config=AppConfig):
+    """
+    Logs to LOG_FILE and also to the console. Callers format the record and
+    put it on a queue; a QueueListener thread does the disk writes.
+    """
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    file_handler = logging.FileHandler(config.LOG_FILE, mode="a", encoding="utf-8")
+    file_handler.setFormatter(formatter)
+
+    # Also log to console
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(config.LOG_LEVEL)
+    console_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(config.LOG_RATE_LIMIT, config.LOG_RATE_LIMIT_INTERVAL))
+
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(config.LOG_LEVEL)
+
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+
+apply_env_overrides()
@@ -1,5 +1,4 @@
 import logging
-import pandas as pd
 from config import AppConfig
 from services.fetch_service import get_app_metadata, get_comments_data, get_app_links
 from services.playwright_service import fetch_comments_full_page_with_timeout
@@ -55,9 +54,7 @@ async def process_app(full_url):
     logging.info(f"💬 Fetched {len(comments)} comments for {app_metadata['app_name']}")
 
     # Store Data
-    app_df = pd.DataFrame([app_metadata])
-    comments_df = pd.DataFrame(comments)
-    write_to_excel(app_df, comments_df)
+    write_to_excel(app_metadata, comments)
 
     logging.info(f"📂 Data saved successfully for: {app_metadata['app_name']}")
     logging.info("------------------------------------------------------------")
@@ -80,6 +77,7 @@ async def main():
 
 
 if __name__ == "__main__":
+    AppConfig.load()
     try:
         logging.info("🚀 Starting Crawler...")
         asyncio.run(main())
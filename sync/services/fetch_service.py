@@ -1,7 +1,6 @@
 import concurrent.futures
 import logging
 import uuid
-from bs4 import BeautifulSoup
 from utils import send_request, clean_text
 from typing import List, TypedDict, Optional
 from config import AppConfig
@@ -29,6 +28,13 @@ class CommentMetadata(TypedDict):
     app_id: int
 
 
+def _soup(html: str):
+    """Parses HTML with lxml. bs4 is imported on first use to keep startup fast."""
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, "lxml")
+
+
 def run_with_timeout(func, *args, timeout=60):
     """Runs a function with a timeout using ThreadPoolExecutor."""
     with concurrent.futures.ThreadPoolExecutor() as executor:
@@ -50,7 +56,7 @@ def get_app_metadata(app_url: str) -> Optional[AppMetadata]:
             if AppConfig.FETCH_WITH_TIMEOUT
             else send_request(app_url)
         )
-        soup = BeautifulSoup(response.text, "lxml")
+        soup = _soup(response.text)
 
         detail_page_header = soup.find("section", class_="DetailsPageHeader")
         app_name = detail_page_header.find("h1", class_="AppName").text
@@ -94,7 +100,7 @@ def get_app_links(url: str):
             if AppConfig.FETCH_WITH_TIMEOUT
             else send_request(url)
         )
-        soup = BeautifulSoup(response.text, "lxml")
+        soup = _soup(response.text)
         titles = soup.find_all("a", "SimpleAppItem SimpleAppItem--single")
         return [title.get("href") for title in titles]
 
@@ -123,7 +129,7 @@ def get_comments_data(page_html: str, app_id: int) -> List[CommentMetadata]:
 
 def _extract_comments(page_html: str, app_id: int) -> List[CommentMetadata]:
     """Helper function to extract comments without timeout handling."""
-    soup = BeautifulSoup(page_html, "lxml")
+    soup = _soup(page_html)
     app_comments_divs = soup.find_all("div", "AppComment")
 
     return [
@@ -1,11 +1,13 @@
 from config import AppConfig
-from openpyxl import load_workbook
-import pandas as pd
 import logging
 
+# pandas and openpyxl take most of the startup time, so they are imported on first write
+
+
 def create_excel_if_not_exists():
     """Ensures the Excel file is initialized with correct headers."""
     import os
+    import pandas as pd
     if not os.path.exists(AppConfig.EXCEL_FILE):
         with pd.ExcelWriter(AppConfig.EXCEL_FILE, engine="openpyxl") as writer:
             pd.DataFrame(columns=["app_id", "app_name", "description_content", "installation_counts", "app_score", "app_category", "app_size", "app_last_update", "app_images"]).to_excel(writer, sheet_name="Apps", index=False)
@@ -13,9 +15,14 @@ def create_excel_if_not_exists():
         logging.info(f"📁 Created new Excel file: {AppConfig.EXCEL_FILE}")
         
         
-def write_to_excel(app_df, comments_df):
-    """Writes data to an Excel file without duplicating apps."""
+def write_to_excel(app_metadata, comments):
+    """Writes one app and its comments to the Excel file without duplicating apps."""
     import os
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    app_df = pd.DataFrame([app_metadata])
+    comments_df = pd.DataFrame(comments)
     file_exists = os.path.exists(AppConfig.EXCEL_FILE)
 
     with pd.ExcelWriter(AppConfig.EXCEL_FILE, mode="a", engine="openpyxl", if_sheet_exists="overlay") as writer:
@@ -1,7 +1,6 @@
 import logging
 import asyncio
 import traceback
-from playwright.async_api import async_playwright
 from config import AppConfig
 
 
@@ -20,6 +19,8 @@ async def fetch_comments_full_page_with_timeout(url: str) -> str:
 async def get_page_w_all_comments_html(url: str) -> str:
     """Scrapes all comments but stops if it takes too long."""
     logging.info(f"🔄 Opening {url} to scrape all comments...")
+    # Imported here so runs that never open a browser don't load Playwright
+    from playwright.async_api import async_playwright
 
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=AppConfig.HEADLESS_MODE)
@@ -3,8 +3,8 @@ from requests.exceptions import RequestException, HTTPError, Timeout, Connection
 from typing import Dict, Optional, Union
 import unicodedata
 from config import AppConfig
+import csv
 import logging
-import pandas as pd
 import os
 import traceback
 
@@ -81,14 +81,12 @@ def clean_text(text: str) -> str:
 def log_failed_task(url, error_type, error_message):
     """Logs a failed task to CSV."""
 
-    error_data = pd.DataFrame(
-        [{"url": url, "error_type": error_type, "error_message": error_message}]
-    )
-
     file_exists = os.path.exists(AppConfig.FAILED_TASKS_FILE)
-    error_data.to_csv(
-        AppConfig.FAILED_TASKS_FILE, mode="a", index=False, header=not file_exists
-    )
+    with open(AppConfig.FAILED_TASKS_FILE, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if not file_exists:
+            writer.writerow(["url", "error_type", "error_message"])
+        writer.writerow([url, error_type, error_message])
 
     if AppConfig.SHOW_TRACEBACKS:
         logging.error(